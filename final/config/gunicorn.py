@@ -0,0 +1,63 @@
+"""
+Gunicorn settings for Ghar Ko Swad.
+
+    gunicorn -c python:config.gunicorn
+
+Pick a profile with GUNICORN_PROFILE (default: gthread):
+
+- sync     one request per worker process (gunicorn's default)
+- gthread  worker processes with a thread pool each; good for our I/O-bound views
+- gevent   green threads (pip install gevent; with Postgres also psycogreen)
+- uvicorn  ASGI app in config.asgi (pip install uvicorn uvicorn-worker)
+
+The app is preloaded in the master (GUNICORN_PRELOAD=0 turns that off), so
+Django and core are imported once and workers fork with them already in
+(shared) memory. Worker/thread counts come from the CPU count unless
+WEB_CONCURRENCY / GUNICORN_THREADS are set.
+
+Compare profiles with `python manage.py bench_coldstart`.
+"""
+import multiprocessing
+import os
+
+PROFILES = {
+    'sync': ('sync', 'config.wsgi:application'),
+    'gthread': ('gthread', 'config.wsgi:application'),
+    'gevent': ('gevent', 'config.wsgi:application'),
+    'uvicorn': ('uvicorn_worker.UvicornWorker', 'config.asgi:application'),
+}
+
+profile = os.environ.get('GUNICORN_PROFILE', 'gthread')
+if profile not in PROFILES:
+    raise RuntimeError(f'Unknown GUNICORN_PROFILE {profile!r}; choose from {", ".join(PROFILES)}')
+
+if profile == 'gevent':
+    # Patch before the app is preloaded, or Django's thread-locals (e.g. DB connections) are created unpatched
+    from gevent import monkey
+    monkey.patch_all()
+
+cpus = multiprocessing.cpu_count()
+worker_class, wsgi_app = PROFILES[profile]
+
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+# Threaded/async workers already overlap I/O, so they need fewer processes than sync workers
+workers = int(os.environ.get('WEB_CONCURRENCY', 2 * cpus + 1 if profile == 'sync' else cpus + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4 if profile == 'gthread' else 1))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 100))
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers now and then so slow leaks can't grow forever; jitter avoids restarting all at once
+max_requests = 2000
+max_requests_jitter = 200
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    # Connections must not be shared across forked processes
+    from django.db import connections
+    connections.close_all()
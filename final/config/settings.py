@@ -25,13 +25,15 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.querylog.QueryLogMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.profiling.TemplateProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -40,7 +42,6 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -49,19 +50,52 @@ TEMPLATES = [
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.user_profile',
             ],
+            # Compiled templates are kept in memory, also when DEBUG=True
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'gharkoswad',
+    }
+}
+
+# Time every template/block render (Server-Timing header, bench_templates command). Off by default.
+TEMPLATE_PROFILING = os.environ.get('TEMPLATE_PROFILING') == '1'
+
+# Slow-query log (core.querylog, top_queries command): SQL per view and fingerprint, EXPLAIN of slow statements. Off by default.
+QUERY_LOG = os.environ.get('QUERY_LOG') == '1'
+QUERY_LOG_SLOW_MS = float(os.environ.get('QUERY_LOG_SLOW_MS', '100'))
+QUERY_LOG_FLUSH_SECONDS = float(os.environ.get('QUERY_LOG_FLUSH_SECONDS', '10'))
+QUERY_LOG_DIR = Path(os.environ.get('QUERY_LOG_DIR', BASE_DIR / 'querylog'))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        # DJANGO_SQLITE_PATH points the app at another SQLite file (e.g. the loadtest command's scratch copy)
+        'NAME': os.environ.get('DJANGO_SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
     }
 }
 
+# DJANGO_SHARDS=N keeps orders and reviews in N more databases (shard_0 ... shard_<N-1>), each chef's on the one
+# core.sharding places them on; everything else stays in 'default'. Unset or 0: one database for everything.
+SHARD_COUNT = int(os.environ.get('DJANGO_SHARDS', '0'))
+SHARD_DIR = Path(os.environ.get('DJANGO_SHARD_DIR', BASE_DIR / 'shards'))  # must exist
+SHARDS = [f'shard_{n}' for n in range(SHARD_COUNT)]
+for _alias in SHARDS:
+    DATABASES[_alias] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': SHARD_DIR / f'{_alias}.sqlite3'}
+DATABASE_ROUTERS = ['core.sharding.ChefShardRouter'] if SHARDS else []
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -75,9 +109,33 @@ USE_I18N = True
 USE_TZ = True
 
 STATIC_URL = 'static/'
-STATICFILES_DIRS = [BASE_DIR]
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Static sources live in assets/ and are only published as the bundles below (see core/assets.py).
+# Run `python manage.py check --deploy` after collectstatic to make sure nothing else slipped into STATIC_ROOT.
+ASSETS_DIR = BASE_DIR / 'assets'
+ASSET_BUILD_DIR = BASE_DIR / 'build' / 'assets'
+ASSET_BUNDLES = {
+    'css/site.css': ['css/premium.css'],
+    'css/home.css': ['css/premium.css', 'css/index_extra.css'],
+    'js/navbar-user.js': ['js/navbar-user.js'],
+}
+STATICFILES_FINDERS = [
+    'django.contrib.staticfiles.finders.AppDirectoriesFinder',
+    'core.assets.BundleFinder',
+]
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    # Content-hashed names plus prebuilt .gz/.br files; WhiteNoise serves hashed files as immutable
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+WHITENOISE_KEEP_ONLY_HASHED_FILES = True
+
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
@@ -96,3 +154,11 @@ MESSAGE_TAGS = {
 }
 
 AUTH_USER_MODEL = 'core.CustomUser'
+
+# Chef notifications are sent by background jobs (manage.py run_workers); printed to the console unless configured
+EMAIL_BACKEND = os.environ.get('DJANGO_EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = os.environ.get('DJANGO_DEFAULT_FROM_EMAIL', 'Ghar Ko Swad <noreply@gharkoswad.com>')
+
+# Delivery area: local list of localities used to place addresses on the map (no external geocoder)
+GAZETTEER_PATH = BASE_DIR / 'core' / 'data' / 'gazetteer.csv'
+MAX_DELIVERY_RADIUS_KM = 10
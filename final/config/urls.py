@@ -9,5 +9,4 @@ urlpatterns = [
 ]
 
 if settings.DEBUG:
-    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT or settings.BASE_DIR)
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -1,6 +1,50 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import Order, CustomUser, FoodItem, Review
+from django.core.exceptions import ValidationError
+from . import sharding
+from .models import Order, CustomUser, FoodItem, Review, Job, Favorite, DeliverySlot
+
+
+def _shard(request):
+    alias = request.GET.get('shard')
+    return alias if alias in sharding.aliases() else sharding.aliases()[0]
+
+
+class ShardListFilter(admin.SimpleListFilter):
+    """Picks the shard to list; ShardedModelAdmin.get_queryset applies it."""
+    title = 'shard'
+    parameter_name = 'shard'
+
+    def lookups(self, request, model_admin):
+        return [(alias, alias) for alias in sharding.aliases()]
+
+    def queryset(self, request, queryset):
+        return queryset
+
+
+class ShardedModelAdmin(admin.ModelAdmin):
+    """Admin for Order/Review, whose rows may be spread over shards (core.sharding): lists one shard at a time."""
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return queryset.using(_shard(request)) if sharding.enabled() else queryset
+
+    def get_list_filter(self, request):
+        list_filter = super().get_list_filter(request)
+        return (ShardListFilter, *list_filter) if sharding.enabled() else list_filter
+
+    def get_list_select_related(self, request):
+        # A shard has no users or dishes to join to
+        return () if sharding.enabled() else super().get_list_select_related(request)
+
+    def get_object(self, request, object_id, from_field=None):
+        # Change/delete pages: look the row up on every shard
+        field = self.model._meta.pk if from_field is None else self.model._meta.get_field(from_field)
+        try:
+            object_id = field.to_python(object_id)
+        except ValidationError:
+            return None
+        return sharding.find(self.get_queryset(request).filter(**{field.name: object_id}))
 
 
 @admin.register(CustomUser)
@@ -11,6 +55,7 @@ class CustomUserAdmin(BaseUserAdmin):
     fieldsets = (
         (None, {'fields': ('email', 'password')}),
         ('Personal info', {'fields': ('first_name', 'phone', 'address', 'user_type', 'speciality')}),
+        ('Delivery area', {'fields': ('latitude', 'longitude', 'delivery_radius_km')}),
         ('Permissions', {'fields': ('is_active', 'is_staff', 'is_superuser')}),
     )
     add_fieldsets = (
@@ -21,17 +66,40 @@ class CustomUserAdmin(BaseUserAdmin):
 
 @admin.register(FoodItem)
 class FoodItemAdmin(admin.ModelAdmin):
-    list_display = ('name', 'chef', 'category', 'price', 'created_at')
+    list_display = ('name', 'chef', 'category', 'price', 'rating_score', 'trending_score', 'created_at')
     list_filter = ('category', 'is_vegetarian')
 
 
 @admin.register(Review)
-class ReviewAdmin(admin.ModelAdmin):
+class ReviewAdmin(ShardedModelAdmin):
     list_display = ('food_item', 'customer', 'rating', 'created_at')
 
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(ShardedModelAdmin):
     list_display = ('id', 'name', 'chef', 'quantity', 'total', 'status', 'created_at')
     list_filter = ('status',)
     search_fields = ('name', 'phone', 'address')
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'priority', 'attempts', 'run_after', 'created_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('locked_by', 'locked_at', 'last_error', 'finished_at')
+
+
+@admin.register(Favorite)
+class FavoriteAdmin(admin.ModelAdmin):
+    list_display = ('customer', 'food_item', 'order_count', 'score', 'last_ordered_at')
+    raw_id_fields = ('customer', 'food_item', 'last_order')
+    search_fields = ('customer__email', 'food_item__name')
+
+
+@admin.register(DeliverySlot)
+class DeliverySlotAdmin(admin.ModelAdmin):
+    list_display = ('chef', 'start', 'end', 'booked', 'capacity')
+    list_filter = ('start',)
+    raw_id_fields = ('chef',)
+    # booked is a counter maintained by core.slots
+    readonly_fields = ('booked',)
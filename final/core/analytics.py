@@ -0,0 +1,256 @@
+"""
+Chef analytics: hourly and daily rollups of orders and reviews.
+
+SalesRollup has one row per (chef, food item, grain, bucket), where bucket is
+the start of the local hour or day. Orders count in the bucket they were
+placed in, reviews in the bucket they were written in:
+
+- a new order adds to orders, quantity and revenue (core.signals)
+- a status change moves it in or out of delivered/cancelled (chef dashboard)
+- a new review adds to reviews and rating_sum (core.signals)
+
+Dashboard charts read a range of rows for one chef on the (chef, grain, bucket)
+index (`series`), so they never touch Order/Review. `python manage.py
+backfill_analytics` rebuilds the table from history.
+"""
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from . import sharding
+from .models import FoodItem, Order, Review, SalesRollup
+
+GRAINS = {'hour': timedelta(hours=1), 'day': timedelta(days=1)}
+MAX_POINTS = {'hour': 24 * 31, 'day': 366}
+COUNTERS = ['orders', 'quantity', 'revenue', 'delivered', 'cancelled', 'reviews', 'rating_sum']
+
+
+def parse_total(s):
+    """Parse '₹180' or '180' to Decimal."""
+    if not s:
+        return Decimal('0')
+    s = re.sub(r'[^\d.]', '', str(s))
+    try:
+        return Decimal(s)
+    except Exception:
+        return Decimal('0')
+
+
+def bucket_start(when, grain):
+    """Start of the local hour or day containing `when`."""
+    local = timezone.localtime(when).replace(minute=0, second=0, microsecond=0)
+    if grain == 'day':
+        local = local.replace(hour=0)
+    return timezone.make_aware(local.replace(tzinfo=None))
+
+
+def _bump(chef_id, food_item_id, when, **deltas):
+    """Add `deltas` to the hour and day rows for `when`, creating them if needed."""
+    for grain in GRAINS:
+        key = {'chef_id': chef_id, 'food_item_id': food_item_id, 'grain': grain, 'bucket': bucket_start(when, grain)}
+        changes = {field: F(field) + value for field, value in deltas.items()}
+        if SalesRollup.objects.filter(**key).update(**changes):
+            continue
+        try:
+            with transaction.atomic():
+                SalesRollup.objects.create(**key, **deltas)
+        except IntegrityError:
+            # Created by a concurrent request since our UPDATE
+            SalesRollup.objects.filter(**key).update(**changes)
+
+
+def record_order(order):
+    if order.chef_id and order.food_item_id:
+        _bump(order.chef_id, order.food_item_id, order.created_at,
+              orders=1, quantity=order.quantity, revenue=parse_total(order.total))
+
+
+def record_status_change(order, old_status):
+    """Update delivered/cancelled counts after order.status changed from `old_status`."""
+    record_status_changes([(order, old_status)])
+
+
+def record_status_changes(changes):
+    """Batch form of record_status_change for [(order, old_status)]: one update per dish and hour."""
+    deltas = defaultdict(lambda: dict.fromkeys(('delivered', 'cancelled'), 0))
+    for order, old_status in changes:
+        if not order.chef_id or not order.food_item_id or order.status == old_status:
+            continue
+        counts = deltas[order.chef_id, order.food_item_id, bucket_start(order.created_at, 'hour')]
+        for status in counts:
+            if order.status == status:
+                counts[status] += 1
+            elif old_status == status:
+                counts[status] -= 1
+    for (chef_id, food_item_id, hour), counts in deltas.items():
+        counts = {status: n for status, n in counts.items() if n}
+        if counts:
+            _bump(chef_id, food_item_id, hour, **counts)
+
+
+def record_review(review):
+    chef_id = FoodItem.objects.filter(id=review.food_item_id).values_list('chef_id', flat=True).first()
+    if chef_id:
+        _bump(chef_id, review.food_item_id, review.created_at, reviews=1, rating_sum=review.rating)
+
+
+def _local_seconds(np, values):
+    """Seconds since 1970-01-01 in local wall-clock time, so flooring gives local hour/day starts."""
+    naive_epoch = datetime(1970, 1, 1)
+    return np.array([(timezone.localtime(v).replace(tzinfo=None) - naive_epoch).total_seconds() for v in values], dtype=np.int64)
+
+
+def _rollup_batch(np, totals, chef_ids, item_ids, created, columns):
+    """Group one batch of events by (chef, item, bucket) for every grain and add `columns` into `totals`."""
+    seconds = _local_seconds(np, created)
+    chef_ids = np.asarray(chef_ids, dtype=np.int64)
+    item_ids = np.asarray(item_ids, dtype=np.int64)
+    naive_epoch = datetime(1970, 1, 1)
+    for grain, step in GRAINS.items():
+        step = int(step.total_seconds())
+        keys = np.stack([chef_ids, item_ids, seconds // step * step], axis=1)
+        unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        sums = {name: np.bincount(inverse, weights=values, minlength=len(unique)) for name, values in columns.items()}
+        for n, (chef_id, item_id, start) in enumerate(unique.tolist()):
+            row = totals[grain, chef_id, item_id, naive_epoch + timedelta(seconds=start)]
+            for name in columns:
+                row[name] += sums[name][n]
+
+
+def _batches(queryset, size):
+    """Rows of `queryset` from every shard, `size` at a time."""
+    batch = []
+    for shard_queryset in sharding.each(queryset):
+        for row in shard_queryset.iterator(chunk_size=size):
+            batch.append(row)
+            if len(batch) == size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def backfill(batch_size=5000):
+    """Rebuild all rollups from Order/Review history in vectorized batches. Returns rows written."""
+    import numpy as np
+
+    totals = defaultdict(lambda: dict.fromkeys(COUNTERS, 0.0))
+    orders = (
+        Order.objects.filter(chef__isnull=False, food_item__isnull=False).order_by()
+        .values_list('chef_id', 'food_item_id', 'created_at', 'quantity', 'total', 'status')
+    )
+    for batch in _batches(orders, batch_size):
+        _backfill_orders(np, totals, batch)
+
+    # Reviews may be on shards, away from the dish table: look their chefs up here
+    item_chefs = dict(FoodItem.objects.values_list('id', 'chef_id'))
+    reviews = Review.objects.order_by().values_list('food_item_id', 'created_at', 'rating')
+    for batch in _batches(reviews, batch_size):
+        rows = [(item_chefs[item_id], item_id, when, rating) for item_id, when, rating in batch if item_id in item_chefs]
+        if not rows:
+            continue
+        chef_ids, item_ids, created, ratings = zip(*rows)
+        _rollup_batch(np, totals, chef_ids, item_ids, created, {
+            'reviews': np.ones(len(ratings)),
+            'rating_sum': np.asarray(ratings, dtype=np.float64),
+        })
+
+    rollups = [
+        SalesRollup(
+            chef_id=chef_id, food_item_id=item_id, grain=grain, bucket=timezone.make_aware(start),
+            revenue=Decimal(str(round(row.pop('revenue'), 2))),
+            **{name: int(round(value)) for name, value in row.items()},
+        )
+        for (grain, chef_id, item_id, start), row in totals.items()
+    ]
+    with transaction.atomic():
+        SalesRollup.objects.all().delete()
+        SalesRollup.objects.bulk_create(rollups, batch_size=1000)
+    return len(rollups)
+
+
+def _backfill_orders(np, totals, batch):
+    chef_ids, item_ids, created, quantity, total, status = zip(*batch)
+    status = np.asarray(status)
+    _rollup_batch(np, totals, chef_ids, item_ids, created, {
+        'orders': np.ones(len(batch)),
+        'quantity': np.asarray(quantity, dtype=np.float64),
+        'revenue': np.array([float(parse_total(t)) for t in total]),
+        'delivered': (status == 'delivered').astype(np.float64),
+        'cancelled': (status == 'cancelled').astype(np.float64),
+    })
+
+
+def bucket_range(start, end, grain):
+    """Bucket starts from `start` up to (not including) `end`, both already bucket-aligned."""
+    buckets = []
+    current = timezone.localtime(start).replace(tzinfo=None)
+    end = timezone.localtime(end).replace(tzinfo=None)
+    while current < end and len(buckets) < MAX_POINTS[grain]:
+        buckets.append(timezone.make_aware(current))
+        current += GRAINS[grain]
+    return buckets
+
+
+def series(chef, grain, start, end, food_item_id=None, top=5):
+    """Chart-ready, zero-filled series for one chef between two datetimes, plus the best-selling dishes."""
+    start, end = bucket_start(start, grain), bucket_start(end, grain)
+    buckets = bucket_range(start, end, grain)
+    if buckets:
+        end = buckets[-1] + GRAINS[grain]
+    rows = SalesRollup.objects.filter(chef=chef, grain=grain, bucket__gte=start, bucket__lt=end)
+    if food_item_id:
+        rows = rows.filter(food_item_id=food_item_id)
+    per_bucket = {
+        r['bucket']: r
+        for r in rows.values('bucket').annotate(**{name: Sum(name) for name in COUNTERS}).order_by()
+    }
+    empty = dict.fromkeys(COUNTERS, 0)
+    points = [per_bucket.get(b, empty) for b in buckets]
+    orders = [p['orders'] for p in points]
+    cancelled = [p['cancelled'] for p in points]
+    top_dishes = (
+        rows.filter(food_item__isnull=False)
+        .values('food_item_id', 'food_item__name')
+        .annotate(quantity=Sum('quantity'), orders=Sum('orders'), revenue=Sum('revenue'))
+        .order_by('-quantity')[:top]
+    )
+    totals = {name: sum(p[name] for p in points) for name in COUNTERS}
+    return {
+        'grain': grain,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'buckets': [timezone.localtime(b).isoformat() for b in buckets],
+        'series': {
+            'orders': orders,
+            'quantity': [p['quantity'] for p in points],
+            'revenue': [float(p['revenue']) for p in points],
+            'delivered': [p['delivered'] for p in points],
+            'cancelled': cancelled,
+            'cancellation_rate': [round(c / o, 3) if o else None for c, o in zip(cancelled, orders)],
+            'avg_rating': [round(p['rating_sum'] / p['reviews'], 2) if p['reviews'] else None for p in points],
+        },
+        'totals': {
+            'orders': totals['orders'],
+            'quantity': totals['quantity'],
+            'revenue': float(totals['revenue']),
+            'cancellation_rate': round(totals['cancelled'] / totals['orders'], 3) if totals['orders'] else None,
+            'avg_rating': round(totals['rating_sum'] / totals['reviews'], 2) if totals['reviews'] else None,
+        },
+        'top_dishes': [
+            {
+                'id': d['food_item_id'],
+                'name': d['food_item__name'],
+                'quantity': d['quantity'],
+                'orders': d['orders'],
+                'revenue': float(d['revenue']),
+            }
+            for d in top_dishes
+        ],
+    }
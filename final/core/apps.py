@@ -5,3 +5,6 @@ class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
     verbose_name = 'Ghar Ko Swad'
+
+    def ready(self):
+        from . import checks, signals, tasks  # noqa: F401
@@ -0,0 +1,47 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# What may be served from STATIC_ROOT; anything else (Python, databases, HTML mockups, uploads) is a leak
+ASSET_EXTENSIONS = {
+    '.css', '.js', '.map', '.json',
+    '.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp', '.ico',
+    '.woff', '.woff2', '.ttf', '.otf', '.eot',
+    '.gz', '.br',
+}
+DOC_NAMES = ('license', 'readme')
+
+
+def _is_asset(path):
+    if path.suffix.lower() in ASSET_EXTENSIONS:
+        return True
+    # Third-party static folders (e.g. the admin's vendored JS) ship their licence files
+    return path.name.lower().startswith(DOC_NAMES)
+
+
+@register(Tags.staticfiles, deploy=True)
+def check_static_root(app_configs, **kwargs):
+    """Fail `check --deploy` if STATIC_ROOT holds anything other than static assets."""
+    errors = []
+    base = Path(settings.BASE_DIR).resolve()
+    for directory in getattr(settings, 'STATICFILES_DIRS', []):
+        path = Path(directory[1] if isinstance(directory, (list, tuple)) else directory).resolve()
+        if path == base or base.is_relative_to(path):
+            errors.append(Error(
+                f'STATICFILES_DIRS contains {path}, which would publish the whole project.',
+                hint='Put static sources in assets/ and list them in ASSET_BUNDLES.',
+                id='core.E002',
+            ))
+    root = Path(settings.STATIC_ROOT) if settings.STATIC_ROOT else None
+    if root is None or not root.is_dir():
+        return errors
+    strays = sorted(str(p.relative_to(root)) for p in root.rglob('*') if p.is_file() and not _is_asset(p))
+    if strays:
+        shown = ', '.join(strays[:10]) + (f' (+{len(strays) - 10} more)' if len(strays) > 10 else '')
+        errors.append(Error(
+            f'STATIC_ROOT contains {len(strays)} non-asset file(s): {shown}',
+            hint='Remove them and re-run collectstatic --clear.',
+            id='core.E003',
+        ))
+    return errors
@@ -0,0 +1,72 @@
+"""
+Public per-chef pages (/chefs/<id>/).
+
+The page body is built with one query per collection (the chef's available
+dishes, and the latest reviews of each) and cached under the chef's
+page_version. That counter is bumped whenever something on the page changes:
+the chef's profile (CustomUser.save), their dishes and reviews (core.signals)
+and servings taken off on delivery (core.tasks). It lives in the database, so
+every worker process sees the new key at once and stale bodies simply expire.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import F, Prefetch, prefetch_related_objects
+from django.template.loader import render_to_string
+
+from . import ranking
+from .models import FoodItem, Review
+
+User = get_user_model()
+
+PAGE_TTL = 10 * 60
+REVIEWS_PER_DISH = 3
+RECENT_REVIEWS = 10
+
+
+def cache_key(chef):
+    return f'chef-page:{chef.id}:{chef.page_version}'
+
+
+def invalidate(*chef_ids):
+    User.objects.filter(id__in=chef_ids).update(page_version=F('page_version') + 1)
+
+
+def invalidate_for_items(*food_item_ids):
+    User.objects.filter(food_items__in=food_item_ids).update(page_version=F('page_version') + 1)
+
+
+def body(chef):
+    """Rendered page body for `chef`, from the cache when it is up to date."""
+    key = cache_key(chef)
+    html = cache.get(key)
+    if html is None:
+        html = _render(chef)
+        cache.set(key, html, PAGE_TTL)
+    return html
+
+
+def _render(chef):
+    prefetch_related_objects(
+        [chef],
+        Prefetch(
+            'food_items',
+            queryset=FoodItem.objects.filter(servings_available__gt=0).order_by(*ranking.SORT_ORDERINGS['trending']),
+            to_attr='available_items',
+        ),
+        Prefetch(
+            'available_items__reviews',
+            # Reviews may be on the chef's shard (core.sharding): customers come from default in one more query
+            queryset=Review.objects.prefetch_related('customer').order_by('-created_at')[:REVIEWS_PER_DISH],
+            to_attr='latest_reviews',
+        ),
+    )
+    reviews = sorted(
+        (review for item in chef.available_items for review in item.latest_reviews),
+        key=lambda review: review.created_at,
+        reverse=True,
+    )[:RECENT_REVIEWS]
+    return render_to_string('core/includes/chef_page.html', {
+        'chef': chef,
+        'food_items': chef.available_items,
+        'reviews': reviews,
+    })
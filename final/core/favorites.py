@@ -0,0 +1,127 @@
+"""
+Customer favorites for one-tap reorder.
+
+Each customer has at most KEEP_PER_CUSTOMER Favorite rows, one per dish they
+have had delivered. A row's score uses the same decayed log-weight as the
+trending score (core.ranking): every delivered order adds log(quantity) plus
+its order time's offset from EPOCH, so dishes ordered often and recently come
+first. The row also remembers the last order, which pre-fills the reorder form.
+
+Rows are updated one delivery at a time by the 'record_favorite' job (see
+core.tasks), and reading a customer's top N is a single query on the
+(customer, -score) index. `python manage.py rebuild_favorites` recomputes them
+all from delivered orders.
+"""
+import math
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from . import ranking, sharding
+from .models import Favorite, Order
+
+TOP_N = 4  # shown on the home page and dashboard
+KEEP_PER_CUSTOMER = 20
+
+
+def top_for(customer, limit=TOP_N):
+    top = list(
+        Favorite.objects.filter(customer=customer)
+        .select_related('food_item__chef')
+        .order_by('-score')[:limit]
+    )
+    # The last orders are on their chefs' shards (core.sharding), not joinable from here
+    order_ids = [favorite.last_order_id for favorite in top if favorite.last_order_id]
+    orders = {order.id: order for order in sharding.gather(Order.objects.filter(id__in=order_ids))} if order_ids else {}
+    for favorite in top:
+        if favorite.last_order_id in orders:
+            favorite.last_order = orders[favorite.last_order_id]
+    return top
+
+
+def _add(order, when, weight):
+    """Add the delivery to an existing row; 0 if there is none (or it already counted this order)."""
+    return (
+        Favorite.objects.filter(customer_id=order.customer_id, food_item_id=order.food_item_id)
+        .exclude(last_order_id=order.id)
+        .update(
+            order_count=F('order_count') + 1,
+            score=ranking.logaddexp_expr('score', weight),
+            last_order=order,
+            last_ordered_at=when,
+        )
+    )
+
+
+def record_delivery(order):
+    """Fold a delivered order into its customer's favorites. Safe to repeat for the same order."""
+    if not order.customer_id or not order.food_item_id:
+        return
+    when = order.created_at
+    weight = ranking.order_weight(order.quantity, when)
+    if _add(order, when, weight):
+        return
+    try:
+        with transaction.atomic():
+            Favorite.objects.create(
+                customer_id=order.customer_id,
+                food_item_id=order.food_item_id,
+                last_order=order,
+                order_count=1,
+                score=weight,
+                last_ordered_at=when,
+            )
+    except IntegrityError:
+        # Row exists: this order was already counted, or another delivery created it just now
+        _add(order, when, weight)
+        return
+    _prune(order.customer_id)
+
+
+def _prune(customer_id):
+    ranked = Favorite.objects.filter(customer_id=customer_id).order_by('-score').values_list('id', flat=True)
+    stale = list(ranked[KEEP_PER_CUSTOMER:])
+    if stale:
+        Favorite.objects.filter(id__in=stale).delete()
+
+
+def _each_row(queryset, batch_size):
+    for shard_queryset in sharding.each(queryset):
+        yield from shard_queryset.iterator(chunk_size=batch_size)
+
+
+def rebuild_all(batch_size=1000):
+    """Recompute every customer's favorites from delivered orders. Returns the number of rows written."""
+    rows = {}
+    orders = (
+        Order.objects.filter(status='delivered', customer__isnull=False, food_item__isnull=False)
+        .order_by('created_at')
+        .values_list('id', 'customer_id', 'food_item_id', 'quantity', 'created_at')
+    )
+    # Shard by shard: each dish's orders are all on its chef's shard, so they still arrive in order
+    for order_id, customer_id, food_item_id, quantity, created_at in _each_row(orders, batch_size):
+        weight = ranking.order_weight(quantity, created_at)
+        row = rows.get((customer_id, food_item_id))
+        if row is None:
+            rows[customer_id, food_item_id] = [1, weight, order_id, created_at]
+        else:
+            row[0] += 1
+            row[1] = max(row[1], weight) + math.log1p(math.exp(-abs(row[1] - weight)))
+            row[2], row[3] = order_id, created_at
+
+    by_customer = defaultdict(list)
+    for (customer_id, food_item_id), (count, score, order_id, when) in rows.items():
+        by_customer[customer_id].append(Favorite(
+            customer_id=customer_id, food_item_id=food_item_id, last_order_id=order_id,
+            order_count=count, score=score, last_ordered_at=when,
+        ))
+    favorites = []
+    for customer_rows in by_customer.values():
+        customer_rows.sort(key=lambda f: f.score, reverse=True)
+        favorites.extend(customer_rows[:KEEP_PER_CUSTOMER])
+
+    with transaction.atomic():
+        Favorite.objects.all().delete()
+        Favorite.objects.bulk_create(favorites, batch_size=batch_size)
+    return len(favorites)
@@ -0,0 +1,194 @@
+"""
+Delivery-area helpers: geohash encoding, a local gazetteer and "chefs near me" lookups.
+
+Chefs and customers get an optional latitude/longitude (from the gazetteer or set
+in the admin). Each user row also stores its geohash, which is indexed; a lookup
+turns the search circle into a handful of geohash cells and asks the database for
+each cell as a string range (geohash >= cell AND geohash < cell + '~'), so only
+chefs in nearby cells are ever loaded. Exact distances are checked on that small
+candidate set only.
+"""
+import csv
+import math
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db.models import Q
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+MAX_CELLS = 64  # range scans per lookup; covering_cells picks the finest precision within it
+# Words after a place name that make it a street named after the place, e.g. "Patan Road"
+STREET_WORDS = {'road', 'rd', 'marg', 'sadak', 'street', 'st', 'lane', 'galli', 'path', 'chowk'}
+_WORD = re.compile(r'[a-z0-9]+')
+
+
+def encode(lat, lon, precision=GEOHASH_PRECISION):
+    """Geohash of (lat, lon) with `precision` characters."""
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            if lon >= mid:
+                value = value * 2 + 1
+                lon_lo = mid
+            else:
+                value *= 2
+                lon_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                value = value * 2 + 1
+                lat_lo = mid
+            else:
+                value *= 2
+                lat_hi = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = 0
+            value = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(height, width) of a geohash cell in degrees."""
+    lon_bits = math.ceil(5 * precision / 2)
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def covering_cells(lat, lon, radius_km):
+    """Geohash prefixes whose union covers the circle of `radius_km` around (lat, lon).
+
+    Uses the finest precision that needs at most MAX_CELLS cells (precision 5,
+    cells of about 5 km, for a 10 km radius), takes enough rings of cells around
+    the centre to reach the radius and drops the cells the circle doesn't touch.
+    """
+    lon_scale = KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01)
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        lat_rings = math.ceil(radius_km / (height * KM_PER_DEGREE))
+        lon_rings = math.ceil(radius_km / (width * lon_scale))
+        if (2 * lat_rings + 1) * (2 * lon_rings + 1) <= MAX_CELLS:
+            break
+    row = math.floor((lat + 90.0) / height)
+    col = math.floor((lon + 180.0) / width)
+    cells = set()
+    for r in range(row - lat_rings, row + lat_rings + 1):
+        south = r * height - 90.0
+        if south >= 90.0 or south + height <= -90.0:
+            continue
+        for c in range(col - lon_rings, col + lon_rings + 1):
+            west = c * width - 180.0
+            # Closest point of the cell to the centre
+            near_lat = min(max(lat, south), south + height)
+            near_lon = min(max(lon, west), west + width)
+            if haversine_km(lat, lon, near_lat, near_lon) > radius_km:
+                continue
+            cell_lon = (west + width / 2 + 180.0) % 360.0 - 180.0
+            cells.add(encode(south + height / 2, cell_lon, precision))
+    return sorted(cells)
+
+
+def cells_filter(cells, field='geohash'):
+    """Q matching rows whose `field` starts with any of `cells`, written as index range scans."""
+    q = Q()
+    for cell in cells:
+        q |= Q(**{f'{field}__gte': cell, f'{field}__lt': cell + '~'})
+    return q
+
+
+def _words(text):
+    return ' '.join(_WORD.findall(text.lower()))
+
+
+@lru_cache(maxsize=1)
+def gazetteer():
+    """Locality names (lower-case words) -> (lat, lon), longest names first, from GAZETTEER_PATH."""
+    places = []
+    with open(settings.GAZETTEER_PATH, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            places.append((_words(row['name']), float(row['lat']), float(row['lon'])))
+    places.sort(key=lambda p: len(p[0]), reverse=True)
+    return places
+
+
+def _named_in(words, name):
+    """True if `name` occurs in `words` as whole words and isn't the start of a street name."""
+    text = f' {words} '
+    start = text.find(f' {name} ')
+    while start != -1:
+        following = text[start + len(name) + 2:].split(' ', 1)[0]
+        if following not in STREET_WORDS:
+            return True
+        start = text.find(f' {name} ', start + 1)
+    return False
+
+
+def geocode(address):
+    """
+    (lat, lon) of the gazetteer locality named in `address`, or None.
+
+    The address is read one comma-separated part at a time, most specific first
+    ("Jhamsikhel, Sanepa, Lalitpur" is Sanepa if Jhamsikhel isn't listed), and a
+    name only matches whole words that aren't a street named after it ("Patan
+    Road, Kathmandu" is Kathmandu). Within a part the longest name wins. This is a
+    lookup against a short list, not a geocoder: a place missing from the
+    gazetteer falls back to a coarser one, or to nothing.
+    """
+    for part in (address or '').split(','):
+        words = _words(part)
+        if not words:
+            continue
+        for name, lat, lon in gazetteer():
+            if _named_in(words, name):
+                return lat, lon
+    return None
+
+
+def user_location(user):
+    if user.latitude is None or user.longitude is None:
+        return None
+    return user.latitude, user.longitude
+
+
+def delivers_to(chef, lat, lon):
+    """True if (lat, lon) is inside the chef's delivery radius (or the chef has no location set)."""
+    location = user_location(chef)
+    if location is None:
+        return True
+    radius = min(chef.delivery_radius_km, settings.MAX_DELIVERY_RADIUS_KM)
+    return haversine_km(location[0], location[1], lat, lon) <= radius
+
+
+def chefs_delivering_to(lat, lon):
+    """Ids of chefs whose delivery radius covers (lat, lon), plus chefs without a location (see delivers_to)."""
+    from django.contrib.auth import get_user_model
+
+    radius = settings.MAX_DELIVERY_RADIUS_KM
+    candidates = (
+        get_user_model().objects.filter(user_type='chef')
+        .filter(cells_filter(covering_cells(lat, lon, radius)) | Q(geohash=''))
+        .values_list('id', 'latitude', 'longitude', 'delivery_radius_km')
+    )
+    return [
+        chef_id for chef_id, chef_lat, chef_lon, chef_radius in candidates
+        if chef_lat is None or chef_lon is None
+        or haversine_km(chef_lat, chef_lon, lat, lon) <= min(chef_radius, radius)
+    ]
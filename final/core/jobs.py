@@ -0,0 +1,184 @@
+"""
+A small job queue stored in the core_job table.
+
+Views call `enqueue('task_name', **payload)` and return; `python manage.py run_workers`
+runs the jobs in a pool of worker processes. Tasks are plain functions registered
+with `@task('name')` (see core/tasks.py) and receive the payload as keyword
+arguments, so payloads must be JSON-serializable (ids, not model instances).
+
+Claiming a job:
+- PostgreSQL: SELECT ... FOR UPDATE SKIP LOCKED, so workers never wait on each other.
+- SQLite (no row locks): pick candidates, then claim each with a conditional
+  UPDATE ... WHERE status='queued'. Only one worker's UPDATE can match, because
+  SQLite runs writes one at a time.
+
+Failed jobs are retried with exponential backoff until max_attempts, then left
+as 'failed' with the traceback in last_error. Tasks may run more than once
+(e.g. a worker dies mid-job), so they should be safe to repeat.
+
+A worker keeps going through database errors of its own (SQLite's "database is
+locked" when writers pile up past the busy timeout): claiming and saving a
+job's outcome are retried with backoff, and a job whose outcome still can't be
+saved stays 'running' until requeue_stale puts it back (worker 0 runs it every
+SWEEP_INTERVAL, and run_workers at startup).
+"""
+import logging
+import os
+import random
+import signal
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.db import DatabaseError, OperationalError, connection, transaction
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+BACKOFF_BASE = 10  # seconds; retry n waits about BACKOFF_BASE * 2**n
+BACKOFF_MAX = 60 * 60
+STALE_AFTER = timedelta(minutes=15)  # running this long means the worker died
+SWEEP_INTERVAL = 60  # seconds between requeue_stale runs in worker 0
+LOCKED_RETRIES = 5  # tries while the database is locked, LOCKED_WAIT seconds apart and doubling
+LOCKED_WAIT = 0.1
+
+
+def task(name):
+    """Register a function as the handler for jobs called `name`."""
+    def decorator(func):
+        TASKS[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, priority=0, delay=None, max_attempts=5, **payload):
+    """Queue a job. It is part of the caller's transaction, so it is dropped if that rolls back."""
+    if name not in TASKS:
+        raise ValueError(f'Unknown job {name!r}')
+    run_after = timezone.now() + (delay or timedelta(0))
+    return Job.objects.create(name=name, payload=payload, priority=priority, run_after=run_after, max_attempts=max_attempts)
+
+
+def backoff(attempts):
+    seconds = min(BACKOFF_BASE * 2 ** attempts, BACKOFF_MAX)
+    return timedelta(seconds=seconds * random.uniform(0.8, 1.2))
+
+
+def _retry_locked(func):
+    """func(), tried again with backoff while the database is locked."""
+    for attempt in range(LOCKED_RETRIES):
+        try:
+            return func()
+        except OperationalError as exc:
+            if 'locked' not in str(exc) or attempt == LOCKED_RETRIES - 1:
+                raise
+            time.sleep(LOCKED_WAIT * 2 ** attempt * random.uniform(0.5, 1.5))
+
+
+def _due():
+    return Job.objects.filter(status='queued', run_after__lte=timezone.now()).order_by('-priority', 'run_after')
+
+
+def claim(worker_id, limit=1):
+    """Mark up to `limit` due jobs as running for this worker and return them."""
+    now = timezone.now()
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            jobs = list(_due().select_for_update(skip_locked=True)[:limit])
+            Job.objects.filter(id__in=[j.id for j in jobs]).update(status='running', locked_by=worker_id, locked_at=now)
+    else:
+        jobs = []
+        for job in _due()[:limit * 4]:
+            if Job.objects.filter(id=job.id, status='queued').update(status='running', locked_by=worker_id, locked_at=now):
+                jobs.append(job)
+                if len(jobs) == limit:
+                    break
+    for job in jobs:
+        job.status, job.locked_by, job.locked_at = 'running', worker_id, now
+    return jobs
+
+
+def run(job):
+    """Run one claimed job and record the outcome."""
+    job.attempts += 1
+    try:
+        handler = TASKS[job.name]
+        handler(**job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()[-4000:]
+        if job.attempts < job.max_attempts:
+            job.status = 'queued'
+            job.run_after = timezone.now() + backoff(job.attempts)
+        else:
+            job.status = 'failed'
+            job.finished_at = timezone.now()
+        logger.warning('Job %s (%s) failed on attempt %s', job.id, job.name, job.attempts, exc_info=True)
+    else:
+        job.status = 'done'
+        job.finished_at = timezone.now()
+    job.locked_by = ''
+    job.locked_at = None
+    _retry_locked(lambda: job.save(
+        update_fields=['attempts', 'status', 'run_after', 'finished_at', 'last_error', 'locked_by', 'locked_at'],
+    ))
+    return job.status
+
+
+def requeue_stale():
+    """Put jobs whose worker died while running them back in the queue."""
+    cutoff = timezone.now() - STALE_AFTER
+    return Job.objects.filter(status='running', locked_at__lt=cutoff).update(status='queued', locked_by='', locked_at=None)
+
+
+_stopping = False
+
+
+def _stop(signum, frame):
+    global _stopping
+    _stopping = True
+
+
+def worker_init():
+    """Process pool initializer: set up Django in the child and stop cleanly on SIGTERM/SIGINT."""
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+    from django.db import connections
+    connections.close_all()  # never reuse a connection inherited from the parent
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+
+def worker_loop(index, poll_interval=1.0, burst=False, batch=1):
+    """Claim and run jobs until stopped (or, with burst, until the queue is empty). Returns jobs processed."""
+    worker_id = f'{socket.gethostname()}:{os.getpid()}:{index}'
+    processed = 0
+    next_sweep = time.monotonic()
+    while not _stopping:
+        try:
+            if index == 0 and time.monotonic() >= next_sweep:
+                _retry_locked(requeue_stale)
+                next_sweep = time.monotonic() + SWEEP_INTERVAL
+            jobs = _retry_locked(lambda: claim(worker_id, limit=batch))
+        except DatabaseError:
+            logger.warning('Worker %s could not claim jobs', worker_id, exc_info=True)
+            time.sleep(poll_interval * random.uniform(0.5, 1.5))
+            continue
+        if not jobs:
+            if burst:
+                break
+            time.sleep(poll_interval * random.uniform(0.5, 1.5))
+            continue
+        for job in jobs:
+            try:
+                run(job)
+            except DatabaseError:
+                # The outcome wasn't saved: the job stays 'running' until requeue_stale puts it back
+                logger.warning('Worker %s could not record job %s (%s)', worker_id, job.id, job.name, exc_info=True)
+            processed += 1
+    return processed
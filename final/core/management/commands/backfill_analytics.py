@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import analytics
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the hourly and daily chef analytics rollups from order/review history.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        rows = analytics.backfill(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {rows} rollup rows in {time.monotonic() - started:.2f}s.'))
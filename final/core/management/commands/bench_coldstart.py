@@ -0,0 +1,141 @@
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Profiles defined in config/gunicorn.py (not imported: that module may monkey-patch for gevent)
+PROFILES = ['sync', 'gthread', 'gevent', 'uvicorn']
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _children(pid):
+    """Pids whose parent is `pid` (Linux /proc)."""
+    kids = []
+    for entry in Path('/proc').iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / 'stat').read_text()
+        except OSError:
+            continue
+        # Field 4 is the parent pid; split after the ")" closing the command name
+        if int(stat.rsplit(')', 1)[1].split()[1]) == pid:
+            kids.append(int(entry.name))
+    return kids
+
+
+def _memory_kb(pid):
+    """(rss, pss) of a process in kB; pss splits pages shared with forked siblings fairly."""
+    rss = pss = 0
+    try:
+        for line in Path(f'/proc/{pid}/status').read_text().splitlines():
+            if line.startswith('VmRSS:'):
+                rss = int(line.split()[1])
+        for line in Path(f'/proc/{pid}/smaps_rollup').read_text().splitlines():
+            if line.startswith('Pss:'):
+                pss = int(line.split()[1])
+    except OSError:
+        pass
+    return rss, pss
+
+
+def _run_once(profile, preload, workers, path, timeout):
+    port = _free_port()
+    env = dict(
+        os.environ,
+        GUNICORN_PROFILE=profile,
+        GUNICORN_PRELOAD='1' if preload else '0',
+        GUNICORN_BIND=f'127.0.0.1:{port}',
+        GUNICORN_ACCESS_LOG=os.devnull,
+        WEB_CONCURRENCY=str(workers),
+    )
+    url = f'http://127.0.0.1:{port}{path}'
+    # A file rather than a pipe: nothing reads stderr while the server runs, and a full
+    # pipe buffer would block gunicorn's logging (and with it the workers)
+    log = tempfile.TemporaryFile()
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'python:config.gunicorn'],
+        cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=log,
+    )
+    try:
+        ttfr = None
+        while time.perf_counter() - started < timeout:
+            if proc.poll() is not None:
+                log.seek(0)
+                raise CommandError(f'gunicorn ({profile}) exited early:\n{log.read().decode(errors="replace")[-2000:]}')
+            try:
+                with urllib.request.urlopen(url, timeout=5) as resp:
+                    resp.read()
+                ttfr = time.perf_counter() - started
+                break
+            except OSError:
+                time.sleep(0.02)
+        if ttfr is None:
+            raise CommandError(f'gunicorn ({profile}) did not answer {url} within {timeout}s')
+        # Let the remaining workers finish booting before measuring memory
+        deadline = time.perf_counter() + 10
+        while len(_children(proc.pid)) < workers and time.perf_counter() < deadline:
+            time.sleep(0.05)
+        time.sleep(0.5)
+        master = _memory_kb(proc.pid)
+        worker_mem = [_memory_kb(pid) for pid in _children(proc.pid)]
+        return ttfr, master, worker_mem
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+        log.close()
+
+
+class Command(BaseCommand):
+    help = 'Start gunicorn with each server profile and report time-to-first-response and per-worker memory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', nargs='+', default=['sync', 'gthread'], choices=PROFILES)
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--runs', type=int, default=3)
+        parser.add_argument('--path', default='/')
+        parser.add_argument('--timeout', type=float, default=60)
+        parser.add_argument('--compare-preload', action='store_true', help='Also run every profile with preload_app off.')
+
+    def handle(self, *args, **options):
+        if not Path('/proc/self/status').exists():
+            raise CommandError('bench_coldstart reads process memory from /proc and only runs on Linux.')
+        variants = [(p, True) for p in options['profiles']]
+        if options['compare_preload']:
+            variants += [(p, False) for p in options['profiles']]
+
+        self.stdout.write(f"{options['workers']} workers, {options['runs']} runs each, GET {options['path']}\n")
+        self.stdout.write(f"{'profile':<18} {'ttfr ms':>9} {'master MB':>10} {'worker RSS MB':>14} {'worker PSS MB':>14} {'total PSS MB':>13}")
+        for profile, preload in variants:
+            ttfrs, masters, rss, pss, totals = [], [], [], [], []
+            for _ in range(options['runs']):
+                ttfr, master, workers = _run_once(profile, preload, options['workers'], options['path'], options['timeout'])
+                ttfrs.append(ttfr * 1000)
+                masters.append(master[0] / 1024)
+                rss.extend(w[0] / 1024 for w in workers)
+                pss.extend(w[1] / 1024 for w in workers)
+                totals.append((master[1] + sum(w[1] for w in workers)) / 1024)
+            label = profile + ('' if preload else ' (no preload)')
+            self.stdout.write(
+                f'{label:<18} {statistics.median(ttfrs):>9.0f} {statistics.median(masters):>10.1f} '
+                f'{statistics.mean(rss or [0]):>14.1f} {statistics.mean(pss or [0]):>14.1f} {statistics.median(totals):>13.1f}'
+            )
@@ -0,0 +1,91 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.utils import timezone
+
+from core import profiling
+from core.models import FoodItem, Order, Review
+
+User = get_user_model()
+
+
+def _fake_rows(rows):
+    """Unsaved chefs, items, orders and reviews with ids set, enough to render every listing page."""
+    now = timezone.now()
+    chefs = []
+    for n in range(max(rows // 4, 1)):
+        chef = User(id=900000 + n, email=f'chef{n}@example.com', first_name=f'Chef {n}', user_type='chef',
+                    speciality='Newari', rating_count=n % 40, rating_sum=(n % 40) * 4)
+        chef.food_count = 3
+        chefs.append(chef)
+    customer = User(id=990000, email='customer@example.com', first_name='Customer', user_type='customer')
+    items = [
+        FoodItem(id=900000 + n, chef=chefs[n % len(chefs)], name=f'Dal Bhat {n}', price=Decimal('180.00'),
+                 rating_count=n % 25, rating_sum=(n % 25) * 4, version=1, created_at=now - timedelta(hours=n))
+        for n in range(rows)
+    ]
+    orders = [
+        Order(id=900000 + n, chef=chefs[0], customer=customer, food_item=items[n % rows], name='Customer',
+              phone='9800000000', address='New Baneshwor, Kathmandu', quantity=2, total='₹360',
+              status='pending', created_at=now - timedelta(minutes=n))
+        for n in range(rows)
+    ]
+    reviews = [
+        Review(id=900000 + n, food_item=items[n % rows], customer=customer, rating=n % 5 + 1,
+               text='Tastes like home.', created_at=now - timedelta(minutes=n))
+        for n in range(rows)
+    ]
+    return chefs, items, orders, reviews
+
+
+class Command(BaseCommand):
+    help = 'Render the listing templates with synthetic rows and print per-template and per-block render times.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200, help='Rows per listing (default 200).')
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--cold', action='store_true', help='Clear the cache before every render (no fragment cache hits).')
+
+    def handle(self, *args, **options):
+        profiling.enable()
+        chefs, items, orders, reviews = _fake_rows(options['rows'])
+        request = RequestFactory().get('/')
+        request.user = chefs[0]
+        pages = [
+            ('core/index.html', {'food_items': items, 'sort': 'trending'}),
+            ('core/chef_profile.html', {'chefs': chefs, 'sort': 'trending'}),
+            ('core/food_details.html', {'food_item': items[0], 'reviews': reviews, 'avg_rating': 4.2,
+                                        'review_count': len(reviews), 'is_available': True}),
+            ('core/chef_dashboard.html', {'orders': orders, 'delivered_orders': orders, 'reviews': reviews,
+                                          'food_items': items, 'chef_food_items': items, 'pending_count': 0,
+                                          'completed_count': 0, 'earnings_total': 0, 'earnings_month': 0,
+                                          'avg_rating': 4.2, 'max_delivery_radius_km': 10}),
+        ]
+        # Warm the template loader cache so compile time is not counted
+        for name, context in pages:
+            render_to_string(name, context, request=request)
+        profiling.reset()
+        cache.clear()
+
+        wall = {}
+        for name, context in pages:
+            started = time.perf_counter()
+            for _ in range(options['iterations']):
+                if options['cold']:
+                    cache.clear()
+                render_to_string(name, context, request=request)
+            wall[name] = (time.perf_counter() - started) * 1000 / options['iterations']
+
+        self.stdout.write(f"{options['rows']} rows, {options['iterations']} iterations{' (cold cache)' if options['cold'] else ''}\n")
+        self.stdout.write(f"{'page':<32} {'ms/render':>10}")
+        for name, ms in wall.items():
+            self.stdout.write(f'{name:<32} {ms:>10.2f}')
+        self.stdout.write(f"\n{'template / block':<48} {'calls':>7} {'total ms':>10} {'mean ms':>9}")
+        for key, calls, total_ms, mean_ms in profiling.snapshot()[:25]:
+            self.stdout.write(f'{key:<48} {calls:>7} {total_ms:>10.2f} {mean_ms:>9.3f}')
@@ -0,0 +1,26 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from core import geo
+
+
+class Command(BaseCommand):
+    help = 'Set latitude/longitude for users without a location by matching their address against the local gazetteer.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Re-geocode users that already have a location.')
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.exclude(address='')
+        if not options['all']:
+            users = users.filter(latitude__isnull=True)
+        located = missed = 0
+        for user in users.iterator():
+            location = geo.geocode(user.address)
+            if location is None:
+                missed += 1
+                continue
+            user.latitude, user.longitude = location
+            user.save(update_fields=['latitude', 'longitude'])
+            located += 1
+        self.stdout.write(self.style.SUCCESS(f'Located {located} users; {missed} addresses did not match the gazetteer.'))
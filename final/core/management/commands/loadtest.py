@@ -0,0 +1,310 @@
+import asyncio
+import importlib.util
+import os
+import random
+import re
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.models import FoodItem
+
+from .bench_coldstart import PROFILES, _free_port
+
+User = get_user_model()
+
+ALIAS = 'loadtest'
+PASSWORD = 'loadtest-pass-123'
+CSRF_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+TOKEN_RE = re.compile(r'name="idempotency_key" value="([^"]+)"')
+ORDER_ID_RE = re.compile(r'name="order_id" value="(\d+)"')
+CHEF_STATUSES = ['confirmed', 'preparing', 'delivered']
+
+# Virtual user n gets PERSONAS[n % 10]: 60% anonymous browsers, 30% customers, 10% chefs (mixed from the first users on)
+PERSONAS = ['customer', 'browser', 'chef', 'browser', 'customer', 'browser', 'browser', 'customer', 'browser', 'browser']
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(q / 100 * len(values)), len(values) - 1)]
+
+
+def _seed(path, chefs, customers, items_per_chef):
+    """Copy the local database to `path`, migrate it and add test chefs, customers and dishes."""
+    shutil.copyfile(settings.DATABASES['default']['NAME'], path)
+    connections.databases[ALIAS] = dict(connections.databases['default'], NAME=str(path))
+    call_command('migrate', database=ALIAS, verbosity=0)
+    password = make_password(PASSWORD)  # hash once; hashing per user would dominate the seed time
+    users = [
+        User(email=f'chef{n}@loadtest.local', password=password, first_name=f'Chef {n}', user_type='chef',
+             phone='9800000000', address='Load test kitchen', speciality='Dal bhat')
+        for n in range(chefs)
+    ] + [
+        User(email=f'customer{n}@loadtest.local', password=password, first_name=f'Customer {n}', user_type='customer',
+             phone='9800000000', address='Load test street')
+        for n in range(customers)
+    ]
+    User.objects.using(ALIAS).bulk_create(users)
+    chef_ids = User.objects.using(ALIAS).filter(email__endswith='@loadtest.local', user_type='chef').values_list('id', flat=True)
+    FoodItem.objects.using(ALIAS).bulk_create([
+        FoodItem(chef_id=chef_id, name=f'Dish {chef_id}-{n}', price=150, servings_available=1_000_000)
+        for chef_id in chef_ids for n in range(items_per_chef)
+    ])
+    item_ids = list(FoodItem.objects.using(ALIAS).filter(chef_id__in=list(chef_ids)).values_list('id', flat=True))
+    connections[ALIAS].close()
+    del connections.databases[ALIAS]
+    return item_ids
+
+
+class Stats:
+    """Latencies and failures per route for one stage."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, route, seconds, ok):
+        self.latencies[route].append(seconds)
+        if not ok:
+            self.errors[route] += 1
+
+
+class VirtualUser:
+    def __init__(self, client, stats, persona, email, item_ids, think):
+        self.client = client
+        self.stats = stats
+        self.persona = persona
+        self.email = email
+        self.item_ids = item_ids
+        self.think = think
+
+    async def request(self, route, method, url, **kwargs):
+        started = time.perf_counter()
+        try:
+            resp = await self.client.request(method, url, **kwargs)
+        except Exception:
+            self.stats.record(route, time.perf_counter() - started, False)
+            return None
+        # Our form views redirect after a successful POST; a 200 means the form came back with errors
+        ok = resp.status_code < 400 and not (method == 'POST' and resp.status_code == 200)
+        self.stats.record(route, time.perf_counter() - started, ok)
+        return resp if ok else None
+
+    async def form(self, route, url):
+        """GET a page with a form; return (csrf token, html) or (None, None)."""
+        resp = await self.request(route, 'GET', url)
+        match = resp is not None and CSRF_RE.search(resp.text)
+        return (match.group(1), resp.text) if match else (None, None)
+
+    async def pause(self):
+        if self.think:
+            await asyncio.sleep(random.expovariate(1 / self.think))
+
+    async def login(self):
+        csrf, _ = await self.form('GET /login/', '/login/')
+        if csrf:
+            await self.request('POST /login/', 'POST', '/login/', data={
+                'csrfmiddlewaretoken': csrf, 'username': self.email, 'password': PASSWORD,
+            })
+
+    async def browse(self):
+        path = random.choice(['/', '/', '/?sort=top', '/chefs/', 'food'])
+        if path == 'food':
+            await self.request('GET /food/<id>/', 'GET', f'/food/{random.choice(self.item_ids)}/')
+        else:
+            await self.request(f'GET {path}', 'GET', path)
+
+    async def place_order(self):
+        item_id = random.choice(self.item_ids)
+        csrf, html = await self.form('GET /order/', f'/order/?item={item_id}')
+        token = html and TOKEN_RE.search(html)
+        if csrf and token:
+            await self.request('POST /order/', 'POST', f'/order/?item={item_id}', data={
+                'csrfmiddlewaretoken': csrf, 'idempotency_key': token.group(1), 'food_item_id': item_id,
+                'name': self.email, 'phone': '9800000000', 'address': 'Load test street',
+                'quantity': random.randint(1, 3), 'total': '₹150',
+            })
+
+    async def review(self):
+        item_id = random.choice(self.item_ids)
+        csrf, _ = await self.form('GET /food/<id>/', f'/food/{item_id}/')
+        if csrf:
+            await self.request('POST /food/<id>/', 'POST', f'/food/{item_id}/', data={
+                'csrfmiddlewaretoken': csrf, 'rating': random.randint(3, 5), 'review_text': 'Tasty, just like home.',
+            })
+
+    async def update_order_status(self):
+        csrf, html = await self.form('GET /chef-dashboard/', '/chef-dashboard/')
+        order_ids = html and ORDER_ID_RE.findall(html)
+        if csrf and order_ids:
+            await self.request('POST /chef-dashboard/ (status)', 'POST', '/chef-dashboard/', data={
+                'csrfmiddlewaretoken': csrf, 'action': 'order_status', 'order_id': random.choice(order_ids),
+                'status': random.choice(CHEF_STATUSES),
+            })
+
+    async def run(self, deadline):
+        if self.persona != 'browser':
+            await self.login()
+        actions = {
+            'browser': [(self.browse, 1.0)],
+            'customer': [(self.browse, 0.5), (self.place_order, 0.35), (self.review, 0.15)],
+            'chef': [(self.update_order_status, 1.0)],
+        }[self.persona]
+        funcs, weights = zip(*actions)
+        while time.monotonic() < deadline:
+            await random.choices(funcs, weights)[0]()
+            await self.pause()
+
+
+async def _run_stage(base_url, concurrency, duration, item_ids, customers, chefs, think):
+    import httpx
+
+    stats = Stats()
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=1, max_keepalive_connections=1)
+    users = []
+    for n in range(concurrency):
+        persona = PERSONAS[n % len(PERSONAS)]
+        email = {
+            'browser': '',
+            'customer': f'customer{n % customers}@loadtest.local',
+            'chef': f'chef{n % chefs}@loadtest.local',
+        }[persona]
+        # One client per virtual user: its own cookie jar (session + CSRF cookie) and keep-alive connection
+        client = httpx.AsyncClient(base_url=base_url, timeout=30, limits=limits, follow_redirects=False)
+        users.append(VirtualUser(client, stats, persona, email, item_ids, think))
+    started = time.monotonic()
+    try:
+        await asyncio.gather(*(u.run(deadline) for u in users))
+    finally:
+        await asyncio.gather(*(u.client.aclose() for u in users))
+    return stats, time.monotonic() - started
+
+
+class Command(BaseCommand):
+    help = ('Start gunicorn on a scratch copy of the local database and drive a ramping mix of browsing, logins, orders, '
+            'reviews and chef status updates; report throughput, error rate and latency per route.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', default='gthread', choices=PROFILES)
+        parser.add_argument('--workers', type=int, default=None, help='Gunicorn workers (default: from config.gunicorn).')
+        parser.add_argument('--stages', default='5,10,20,40', help='Comma-separated concurrent users per stage.')
+        parser.add_argument('--stage-duration', type=float, default=20, help='Seconds per stage.')
+        parser.add_argument('--think', type=float, default=0.5, help='Mean think time between actions, in seconds.')
+        parser.add_argument('--chefs', type=int, default=10)
+        parser.add_argument('--customers', type=int, default=100)
+        parser.add_argument('--items-per-chef', type=int, default=5)
+        parser.add_argument('--keep-db', action='store_true', help='Keep the scratch database and print its path.')
+
+    def handle(self, *args, **options):
+        if importlib.util.find_spec('httpx') is None:
+            raise CommandError('loadtest needs httpx (pip install httpx).')
+        try:
+            stages = [int(n) for n in options['stages'].split(',')]
+        except ValueError:
+            raise CommandError('--stages must be comma-separated integers, e.g. 5,10,20.')
+
+        workdir = Path(tempfile.mkdtemp(prefix='gharkoswad-loadtest-'))
+        db_path = workdir / 'db.sqlite3'
+        self.stdout.write(f'Seeding {db_path} ...')
+        item_ids = _seed(db_path, options['chefs'], options['customers'], options['items_per_chef'])
+
+        port = _free_port()
+        env = dict(
+            os.environ,
+            DJANGO_SQLITE_PATH=str(db_path),
+            GUNICORN_PROFILE=options['profile'],
+            GUNICORN_BIND=f'127.0.0.1:{port}',
+            GUNICORN_ACCESS_LOG=os.devnull,
+        )
+        if options['workers']:
+            env['WEB_CONCURRENCY'] = str(options['workers'])
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', 'python:config.gunicorn'],
+            cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        )
+        base_url = f'http://127.0.0.1:{port}'
+        try:
+            self._wait_ready(server, base_url)
+            results = []
+            for concurrency in stages:
+                stats, elapsed = asyncio.run(_run_stage(
+                    base_url, concurrency, options['stage_duration'], item_ids,
+                    options['customers'], options['chefs'], options['think'],
+                ))
+                results.append((concurrency, stats, elapsed))
+                self._report(concurrency, stats, elapsed)
+            self._summary(results)
+        finally:
+            server.send_signal(signal.SIGTERM)
+            try:
+                server.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                server.kill()
+                server.wait()
+            if options['keep_db']:
+                self.stdout.write(f'Scratch database kept at {db_path}')
+            else:
+                for f in workdir.iterdir():
+                    f.unlink()
+                workdir.rmdir()
+
+    def _wait_ready(self, server, base_url, timeout=60):
+        import httpx
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'gunicorn exited early:\n{server.stderr.read().decode()[-2000:]}')
+            try:
+                httpx.get(base_url + '/', timeout=5)
+                return
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        raise CommandError(f'gunicorn did not answer {base_url} within {timeout}s')
+
+    def _report(self, concurrency, stats, elapsed):
+        total = sum(len(v) for v in stats.latencies.values())
+        errors = sum(stats.errors.values())
+        everything = [s for v in stats.latencies.values() for s in v]
+        self.stdout.write(
+            f'\n{concurrency} users: {total / elapsed:.1f} req/s, {100 * errors / max(total, 1):.1f}% errors, '
+            f'p50 {_percentile(everything, 50) * 1000:.0f} ms, p95 {_percentile(everything, 95) * 1000:.0f} ms, '
+            f'p99 {_percentile(everything, 99) * 1000:.0f} ms'
+        )
+        self.stdout.write(f"  {'route':<32} {'reqs':>6} {'err %':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+        for route in sorted(stats.latencies):
+            values = stats.latencies[route]
+            self.stdout.write(
+                f'  {route:<32} {len(values):>6} {100 * stats.errors[route] / len(values):>6.1f} '
+                f'{_percentile(values, 50) * 1000:>8.0f} {_percentile(values, 95) * 1000:>8.0f} '
+                f'{_percentile(values, 99) * 1000:>8.0f} {max(values) * 1000:>8.0f}'
+            )
+
+    def _summary(self, results):
+        rates = [sum(len(v) for v in stats.latencies.values()) / elapsed for _, stats, elapsed in results]
+        best = max(range(len(rates)), key=rates.__getitem__)
+        self.stdout.write(self.style.SUCCESS(
+            f'\nPeak throughput {rates[best]:.1f} req/s at {results[best][0]} users'
+            + (' (still rising: add higher stages to find saturation)' if best == len(rates) - 1 else '')
+            + '; median latency per stage: '
+            + ', '.join(
+                f'{c}u {statistics.median([s for v in stats.latencies.values() for s in v] or [0]) * 1000:.0f} ms'
+                for c, stats, _ in results
+            )
+        ))
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import sharding
+
+
+class Command(BaseCommand):
+    help = (
+        "Move chefs' orders and reviews to the shard the hash ring puts them on "
+        '(after turning sharding on or changing DJANGO_SHARDS).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chef', type=int, help='Only move this chef.')
+        parser.add_argument('--dry-run', action='store_true', help='List the moves without making them.')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if not sharding.enabled():
+            raise CommandError('Sharding is off: set DJANGO_SHARDS (and migrate each shard) first.')
+        started = time.monotonic()
+        moves = sharding.misplaced(options['chef'])
+        for chef_id, source, target in moves:
+            if options['dry_run']:
+                self.stdout.write(f'chef {chef_id}: {source} -> {target}')
+                continue
+            orders, reviews = sharding.move_chef(chef_id, source, target, batch_size=options['batch_size'])
+            self.stdout.write(f'chef {chef_id}: {source} -> {target}: {orders} orders, {reviews} reviews')
+        verb = 'Would move' if options['dry_run'] else 'Moved'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {len(moves)} chef(s) in {time.monotonic() - started:.2f}s.'))
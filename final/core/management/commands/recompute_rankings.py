@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import ranking
+
+
+class Command(BaseCommand):
+    help = 'Rebuild trending and top-rated scores for every food item and chef from order/review history.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        items, chefs = ranking.recompute_all(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Recomputed scores for {items} food items and {chefs} chefs in {time.monotonic() - started:.2f}s.'
+        ))
@@ -0,0 +1,45 @@
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (core.jobs) in a pool of worker processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=max(multiprocessing.cpu_count() // 2, 1))
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to sleep when the queue is empty.')
+        parser.add_argument('--batch', type=int, default=1, help='Jobs claimed per query.')
+        parser.add_argument('--burst', action='store_true', help='Exit once the queue is empty (e.g. from cron).')
+
+    def handle(self, *args, **options):
+        requeued = jobs.requeue_stale()
+        if requeued:
+            self.stdout.write(f'Requeued {requeued} stale job(s).')
+        # Children must open their own connections
+        connections.close_all()
+        processes = options['processes']
+        self.stdout.write(f'Starting {processes} worker process(es).')
+        loop_args = (options['poll_interval'], options['burst'], options['batch'])
+        with ProcessPoolExecutor(max_workers=processes, initializer=jobs.worker_init) as pool:
+            workers = {pool.submit(jobs.worker_loop, n, *loop_args): n for n in range(processes)}
+            processed = 0
+            try:
+                while workers:
+                    done, _ = wait(workers, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        n = workers.pop(future)
+                        try:
+                            processed += future.result()
+                        except Exception as exc:
+                            # Otherwise its share of the queue (servings, favorites, emails) waits for a restart
+                            self.stderr.write(f'Worker {n} stopped with {exc!r}; starting it again.')
+                            workers[pool.submit(jobs.worker_loop, n, *loop_args)] = n
+            except KeyboardInterrupt:
+                self.stdout.write('Stopping workers after their current job...')
+                processed += sum(f.result() for f in workers)
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} job(s).'))
@@ -0,0 +1,90 @@
+import json
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _records(log_dir, since):
+    for path in sorted(Path(log_dir).glob('queries-*.jsonl')):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by a killed worker
+                if record.get('ts', 0) >= since:
+                    yield record
+
+
+class Command(BaseCommand):
+    help = 'Summarize the slow-query logs (QUERY_LOG=1) of all processes: the queries or views costing the most time.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--by', choices=['query', 'view'], default='query')
+        parser.add_argument('--limit', type=int, default=15)
+        parser.add_argument('--hours', type=float, help='Only the last N hours.')
+        parser.add_argument('--view', help='Only queries run by this view (e.g. core:chef_dashboard).')
+        parser.add_argument('--explain', action='store_true', help='Print the latest captured EXPLAIN plan of each query.')
+        parser.add_argument('--dir', default=str(settings.QUERY_LOG_DIR), help='Log directory (default QUERY_LOG_DIR).')
+
+    def handle(self, *args, **options):
+        if not Path(options['dir']).is_dir():
+            raise CommandError(f"No query logs in {options['dir']}: run the server with QUERY_LOG=1 first.")
+        since = time.time() - options['hours'] * 3600 if options['hours'] else 0
+        queries = defaultdict(lambda: {'calls': 0, 'ms': 0.0, 'slow': 0, 'max_ms': 0.0, 'views': Counter(), 'sql': '', 'explain': None})
+        views = defaultdict(lambda: {'requests': 0, 'ms': 0.0, 'queries': 0, 'query_ms': 0.0})
+        for record in _records(options['dir'], since):
+            if options['view'] and record['view'] != options['view']:
+                continue
+            kind = record['type']
+            if kind == 'view':
+                views[record['view']]['requests'] += record['requests']
+                views[record['view']]['ms'] += record['ms']
+            elif kind == 'query':
+                query = queries[record['fingerprint']]
+                query['calls'] += record['calls']
+                query['ms'] += record['ms']
+                query['views'][record['view']] += record['calls']
+                query['sql'] = record['sql']
+                views[record['view']]['queries'] += record['calls']
+                views[record['view']]['query_ms'] += record['ms']
+            elif kind == 'slow':
+                query = queries[record['fingerprint']]
+                query['slow'] += 1
+                query['max_ms'] = max(query['max_ms'], record['ms'])
+                query['sql'] = query['sql'] or record['sql']
+                if record.get('explain'):
+                    query['explain'] = record['explain']
+
+        if options['by'] == 'view':
+            self._views(views, options['limit'])
+        else:
+            self._queries(queries, options['limit'], options['explain'])
+
+    def _views(self, views, limit):
+        rows = sorted(views.items(), key=lambda item: item[1]['query_ms'], reverse=True)[:limit]
+        self.stdout.write(f"{'view':<36} {'requests':>9} {'ms/req':>8} {'queries/req':>12} {'db ms/req':>10} {'db share':>9}")
+        for view, v in rows:
+            requests = v['requests'] or 1
+            share = f"{v['query_ms'] / v['ms']:.0%}" if v['ms'] else '-'
+            self.stdout.write(
+                f"{view:<36} {v['requests']:>9} {v['ms'] / requests:>8.1f} {v['queries'] / requests:>12.1f} "
+                f"{v['query_ms'] / requests:>10.1f} {share:>9}"
+            )
+
+    def _queries(self, queries, limit, explain):
+        rows = sorted(queries.items(), key=lambda item: item[1]['ms'], reverse=True)[:limit]
+        self.stdout.write(f"{'fingerprint':<13} {'calls':>8} {'total ms':>10} {'mean ms':>8} {'slow':>5} {'max ms':>8}  top views")
+        for fp, q in rows:
+            mean = q['ms'] / q['calls'] if q['calls'] else 0
+            top_views = ', '.join(f'{view} x{calls}' for view, calls in q['views'].most_common(3))
+            self.stdout.write(
+                f"{fp:<13} {q['calls']:>8} {q['ms']:>10.1f} {mean:>8.2f} {q['slow']:>5} {q['max_ms']:>8.1f}  {top_views}"
+            )
+            self.stdout.write(f"    {q['sql'][:200]}")
+            if explain and q['explain']:
+                for line in q['explain']:
+                    self.stdout.write(f'      {line}')
@@ -0,0 +1,69 @@
+# Generated by Django 6.0.1 on 2026-10-19 15:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # 0001 and 0003 in one: admin's first migration depends on core's first one for the user
+    # model, so on an empty database (a new shard, the test database) CustomUser has to exist by then.
+    # Databases that already ran 0001 and 0003 just mark this one as applied.
+
+    replaces = [
+        ('core', '0001_initial'),
+        ('core', '0003_customuser_delete_profile'),
+    ]
+
+    initial = True
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Order',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('phone', models.CharField(max_length=20)),
+                ('address', models.TextField()),
+                ('dish', models.CharField(choices=[('thali', 'Homemade Thali'), ('momo', 'Steamed Momo Platter'), ('biryani', 'Veg Biryani'), ('soup', 'Comfort Veg Soup')], max_length=20)),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('total', models.CharField(max_length=50)),
+                ('delivery_time', models.CharField(blank=True, max_length=100)),
+                ('notes', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('confirmed', 'Confirmed'), ('preparing', 'Preparing'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled')], default='confirmed', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CustomUser',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('password', models.CharField(max_length=128, verbose_name='password')),
+                ('last_login', models.DateTimeField(blank=True, null=True, verbose_name='last login')),
+                ('is_superuser', models.BooleanField(default=False, help_text='Designates that this user has all permissions without explicitly assigning them.', verbose_name='superuser status')),
+                ('first_name', models.CharField(blank=True, max_length=150, verbose_name='first name')),
+                ('last_name', models.CharField(blank=True, max_length=150, verbose_name='last name')),
+                ('is_staff', models.BooleanField(default=False, help_text='Designates whether the user can log into this admin site.', verbose_name='staff status')),
+                ('is_active', models.BooleanField(default=True, help_text='Designates whether this user should be treated as active. Unselect this instead of deleting accounts.', verbose_name='active')),
+                ('date_joined', models.DateTimeField(default=django.utils.timezone.now, verbose_name='date joined')),
+                ('email', models.EmailField(max_length=254, unique=True)),
+                ('phone', models.CharField(blank=True, max_length=15)),
+                ('address', models.TextField(blank=True)),
+                ('user_type', models.CharField(choices=[('customer', 'Customer'), ('chef', 'Chef')], default='customer', max_length=10)),
+                ('speciality', models.CharField(blank=True, max_length=200, null=True)),
+                ('groups', models.ManyToManyField(blank=True, help_text='The groups this user belongs to. A user will get all permissions granted to each of their groups.', related_name='user_set', related_query_name='user', to='auth.group', verbose_name='groups')),
+                ('user_permissions', models.ManyToManyField(blank=True, help_text='Specific permissions for this user.', related_name='user_set', related_query_name='user', to='auth.permission', verbose_name='user permissions')),
+            ],
+            options={
+                'verbose_name': 'user',
+                'verbose_name_plural': 'users',
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-19 14:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_ranking_scores'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='delivery_radius_km',
+            field=models.FloatField(default=5, help_text='Chefs only: how far you deliver.'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-19 14:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_user_location'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fooditem',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
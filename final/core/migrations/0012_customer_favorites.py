@@ -0,0 +1,32 @@
+# Generated by Django 6.0.1 on 2026-10-19 14:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_job_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Favorite',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('score', models.FloatField(default=0)),
+                ('last_ordered_at', models.DateTimeField()),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='favorites', to=settings.AUTH_USER_MODEL)),
+                ('food_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='favorited_by', to='core.fooditem')),
+                ('last_order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.order')),
+            ],
+            options={
+                'ordering': ['-score'],
+                'indexes': [models.Index(fields=['customer', '-score'], name='core_favorite_top_idx')],
+                'constraints': [models.UniqueConstraint(fields=('customer', 'food_item'), name='core_favorite_customer_item_uniq')],
+            },
+        ),
+    ]
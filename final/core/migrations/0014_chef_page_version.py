@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-19 14:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='page_version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
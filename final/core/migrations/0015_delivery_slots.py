@@ -0,0 +1,38 @@
+# Generated by Django 6.0.1 on 2026-10-19 14:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_chef_page_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliverySlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.DateTimeField()),
+                ('end', models.DateTimeField()),
+                ('capacity', models.PositiveIntegerField(default=5)),
+                ('booked', models.PositiveIntegerField(default=0)),
+                ('chef', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='delivery_slots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['start'],
+            },
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='delivery_slot',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='orders', to='core.deliveryslot'),
+        ),
+        migrations.AddConstraint(
+            model_name='deliveryslot',
+            constraint=models.UniqueConstraint(fields=('chef', 'start'), name='core_deliveryslot_chef_start_uniq'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 6.0.1 on 2026-10-19 14:35
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def drop_duplicate_reviews(apps, schema_editor):
+    # Keep each customer's first review of a dish so the constraint can be added
+    Review = apps.get_model('core', 'Review')
+    firsts = (
+        Review.objects.values('food_item_id', 'customer_id')
+        .annotate(first_id=Min('id'))
+        .values_list('first_id', flat=True)
+    )
+    Review.objects.exclude(id__in=list(firsts)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_delivery_slots'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_reviews, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='review',
+            constraint=models.UniqueConstraint(fields=('food_item', 'customer'), name='core_review_item_customer_uniq'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 6.0.1 on 2026-10-19 15:10
+
+from django.db import migrations
+
+
+def locate_users(apps, schema_editor):
+    # Users from before delivery areas only have an address; look it up in the gazetteer
+    from core import geo
+
+    User = apps.get_model('core', 'CustomUser')
+    users = User.objects.using(schema_editor.connection.alias).filter(latitude__isnull=True).exclude(address='')
+    for user in users.iterator():
+        location = geo.geocode(user.address)
+        if location is None:
+            continue
+        user.latitude, user.longitude = location
+        # Historical models don't run CustomUser.save(), so derive the geohash here
+        user.geohash = geo.encode(*location)
+        user.save(update_fields=['latitude', 'longitude', 'geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_sharded_foreign_keys'),
+    ]
+
+    operations = [
+        migrations.RunPython(locate_users, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 6.0.1 on 2026-10-19 16:05
+
+import math
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import Count, Sum
+
+
+def _logsumexp(weights):
+    peak = max(weights)
+    return peak + math.log(sum(math.exp(w - peak) for w in weights))
+
+
+def score_history(apps, schema_editor):
+    # 0007 added the score columns at 0; fill them from the orders and reviews already in this database,
+    # the same way `recompute_rankings` does (dishes and chefs only live in default, so shards skip this)
+    from core import ranking
+
+    db = schema_editor.connection.alias
+    FoodItem = apps.get_model('core', 'FoodItem')
+    User = apps.get_model('core', 'CustomUser')
+    Order = apps.get_model('core', 'Order')
+    Review = apps.get_model('core', 'Review')
+    item_chefs = dict(FoodItem.objects.using(db).values_list('id', 'chef_id'))
+    chef_ids = set(User.objects.using(db).filter(user_type='chef').values_list('id', flat=True))
+    if not item_chefs and not chef_ids:
+        return
+
+    weights = {'item': defaultdict(list), 'chef': defaultdict(list)}
+    for item_id, chef_id, quantity, created_at in (
+        Order.objects.using(db).values_list('food_item_id', 'chef_id', 'quantity', 'created_at').iterator()
+    ):
+        weight = ranking.order_weight(quantity, created_at)
+        if item_id in item_chefs:
+            weights['item'][item_id].append(weight)
+        if chef_id in chef_ids:
+            weights['chef'][chef_id].append(weight)
+    ratings = {'item': defaultdict(lambda: [0, 0]), 'chef': defaultdict(lambda: [0, 0])}
+    for row in Review.objects.using(db).order_by().values('food_item_id').annotate(count=Count('id'), total=Sum('rating')):
+        item_id = row['food_item_id']
+        if item_id not in item_chefs:
+            continue
+        for kind, key in (('item', item_id), ('chef', item_chefs[item_id])):
+            ratings[kind][key][0] += row['count']
+            ratings[kind][key][1] += row['total']
+
+    for kind, model, ids in (('item', FoodItem, item_chefs), ('chef', User, chef_ids)):
+        objs = list(model.objects.using(db).filter(id__in=list(ids)).only('id'))
+        for obj in objs:
+            count, total = ratings[kind].get(obj.id, (0, 0))
+            obj.rating_count = count
+            obj.rating_sum = total
+            obj.rating_score = (
+                (ranking.PRIOR_WEIGHT * ranking.PRIOR_RATING + total) / (ranking.PRIOR_WEIGHT + count) if count else 0.0
+            )
+            obj.trending_score = _logsumexp(weights[kind][obj.id]) if weights[kind].get(obj.id) else 0.0
+        model.objects.using(db).bulk_update(
+            objs, ['rating_count', 'rating_sum', 'rating_score', 'trending_score'], batch_size=500,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_backfill_user_locations'),
+    ]
+
+    operations = [
+        migrations.RunPython(score_history, migrations.RunPython.noop),
+    ]
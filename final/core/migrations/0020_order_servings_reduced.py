@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-19 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_backfill_ranking_scores'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='servings_reduced',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 6.0.1 on 2026-10-19 18:40
+
+import math
+
+from django.db import migrations
+
+
+def favorites_from_history(apps, schema_editor):
+    # 0012 added the table empty and only new deliveries fill it; build it from the delivered orders already in this
+    # database, the same way `rebuild_favorites` does (customers and dishes only live in default, so shards skip this)
+    from core import favorites, ranking
+
+    db = schema_editor.connection.alias
+    FoodItem = apps.get_model('core', 'FoodItem')
+    User = apps.get_model('core', 'CustomUser')
+    Order = apps.get_model('core', 'Order')
+    Favorite = apps.get_model('core', 'Favorite')
+    item_ids = set(FoodItem.objects.using(db).values_list('id', flat=True))
+    if not item_ids:
+        return
+    customer_ids = set(User.objects.using(db).values_list('id', flat=True))
+
+    rows = {}
+    orders = (
+        Order.objects.using(db).filter(status='delivered', customer__isnull=False, food_item__isnull=False)
+        .order_by('created_at').values_list('id', 'customer_id', 'food_item_id', 'quantity', 'created_at')
+    )
+    for order_id, customer_id, food_item_id, quantity, created_at in orders.iterator():
+        if customer_id not in customer_ids or food_item_id not in item_ids:
+            continue
+        weight = ranking.order_weight(quantity, created_at)
+        row = rows.get((customer_id, food_item_id))
+        if row is None:
+            rows[customer_id, food_item_id] = [1, weight, order_id, created_at]
+        else:
+            row[0] += 1
+            row[1] = max(row[1], weight) + math.log1p(math.exp(-abs(row[1] - weight)))
+            row[2], row[3] = order_id, created_at
+
+    kept = {}
+    for (customer_id, food_item_id), row in sorted(rows.items(), key=lambda kv: kv[1][1], reverse=True):
+        kept.setdefault(customer_id, []).append(Favorite(
+            customer_id=customer_id, food_item_id=food_item_id, last_order_id=row[2],
+            order_count=row[0], score=row[1], last_ordered_at=row[3],
+        ))
+    Favorite.objects.using(db).all().delete()
+    Favorite.objects.using(db).bulk_create(
+        [f for customer_rows in kept.values() for f in customer_rows[:favorites.KEEP_PER_CUSTOMER]], batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_order_servings_reduced'),
+    ]
+
+    operations = [
+        migrations.RunPython(favorites_from_history, migrations.RunPython.noop),
+    ]
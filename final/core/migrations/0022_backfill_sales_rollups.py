@@ -0,0 +1,59 @@
+# Generated by Django 6.0.1 on 2026-10-19 19:10
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations
+
+
+def rollups_from_history(apps, schema_editor):
+    # 0013 added the table empty and only new orders and reviews fill it; total up the history already in this
+    # database like `backfill_analytics` does, without numpy (chefs and dishes only live in default, so shards skip this)
+    from core import analytics
+
+    db = schema_editor.connection.alias
+    FoodItem = apps.get_model('core', 'FoodItem')
+    Order = apps.get_model('core', 'Order')
+    Review = apps.get_model('core', 'Review')
+    SalesRollup = apps.get_model('core', 'SalesRollup')
+    item_chefs = dict(FoodItem.objects.using(db).values_list('id', 'chef_id'))
+    if not item_chefs:
+        return
+
+    totals = defaultdict(lambda: dict.fromkeys(analytics.COUNTERS, 0))
+
+    def add(chef_id, item_id, when, **counts):
+        for grain in analytics.GRAINS:
+            row = totals[chef_id, item_id, grain, analytics.bucket_start(when, grain)]
+            for name, value in counts.items():
+                row[name] += value
+
+    orders = Order.objects.using(db).filter(food_item__isnull=False).order_by().values_list(
+        'chef_id', 'food_item_id', 'created_at', 'quantity', 'total', 'status',
+    )
+    for chef_id, item_id, created_at, quantity, total, status in orders.iterator():
+        if item_chefs.get(item_id) != chef_id:
+            continue
+        add(chef_id, item_id, created_at, orders=1, quantity=quantity, revenue=analytics.parse_total(total),
+            delivered=int(status == 'delivered'), cancelled=int(status == 'cancelled'))
+    reviews = Review.objects.using(db).order_by().values_list('food_item_id', 'created_at', 'rating')
+    for item_id, created_at, rating in reviews.iterator():
+        if item_id in item_chefs:
+            add(item_chefs[item_id], item_id, created_at, reviews=1, rating_sum=rating)
+
+    SalesRollup.objects.using(db).all().delete()
+    SalesRollup.objects.using(db).bulk_create([
+        SalesRollup(chef_id=chef_id, food_item_id=item_id, grain=grain, bucket=bucket, **{**row, 'revenue': Decimal(row['revenue'])})
+        for (chef_id, item_id, grain, bucket), row in totals.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_backfill_favorites'),
+    ]
+
+    operations = [
+        migrations.RunPython(rollups_from_history, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,9 @@
 from django.db import models
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser, BaseUserManager
+from django.utils import timezone
+
+from . import geo
 
 
 class CustomUserManager(BaseUserManager):
@@ -35,6 +38,18 @@ class CustomUser(AbstractUser):
     address = models.TextField(blank=True)
     user_type = models.CharField(max_length=10, choices=USER_TYPE_CHOICES, default='customer')
     speciality = models.CharField(max_length=200, blank=True, null=True)
+    # Ranking columns for chefs, maintained by core.ranking (see FoodItem for details)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_score = models.FloatField(default=0, db_index=True)
+    trending_score = models.FloatField(default=0, db_index=True)
+    # Optional location; geohash is derived from it on save and indexed for "chefs near me" lookups
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geohash = models.CharField(max_length=12, blank=True, db_index=True, editable=False)
+    delivery_radius_km = models.FloatField(default=5, help_text='Chefs only: how far you deliver.')
+    # Bumped on every change shown on the chef's public page; part of its cache key (core.chef_pages)
+    page_version = models.PositiveIntegerField(default=1, editable=False)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
@@ -43,6 +58,23 @@ class CustomUser(AbstractUser):
     def __str__(self):
         return self.email
 
+    def save(self, *args, **kwargs):
+        location = geo.user_location(self)
+        self.geohash = geo.encode(*location) if location else ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        # Logging in only touches last_login, which the public page doesn't show
+        if self.pk and self.user_type == 'chef' and not (update_fields is not None and set(update_fields) <= {'last_login'}):
+            self.page_version = (self.page_version or 0) + 1
+            if update_fields is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'page_version'}
+        super().save(*args, **kwargs)
+
+    @property
+    def avg_rating(self):
+        return self.rating_sum / self.rating_count if self.rating_count else None
+
 
 
 
@@ -77,6 +109,15 @@ class FoodItem(models.Model):
     is_vegetarian = models.BooleanField(default=True)
     is_spicy = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Ranking columns, maintained by core.ranking:
+    # rating_score is the Bayesian-averaged rating, trending_score the log of time-decayed order volume
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_score = models.FloatField(default=0, db_index=True)
+    trending_score = models.FloatField(default=0, db_index=True)
+    # Bumped on every change shown on the dish card; part of the card's fragment cache key, with the
+    # chef's page_version for the chef name on the card
+    version = models.PositiveIntegerField(default=1)
 
     class Meta:
         ordering = ['-created_at']
@@ -84,11 +125,24 @@ class FoodItem(models.Model):
     def __str__(self):
         return f"{self.name} by {self.chef.get_full_name() or self.chef.email}"
 
+    def save(self, *args, **kwargs):
+        if self.pk:
+            self.version = (self.version or 0) + 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'version'}
+        super().save(*args, **kwargs)
+
+    @property
+    def avg_rating(self):
+        return self.rating_sum / self.rating_count if self.rating_count else None
+
 
 class Review(models.Model):
     RATING_CHOICES = [(i, str(i)) for i in range(1, 6)]
-    food_item = models.ForeignKey(FoodItem, on_delete=models.CASCADE, related_name='reviews')
-    customer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='reviews')
+    # Reviews may live on a shard (core.sharding), so no database-level constraint to default's tables
+    food_item = models.ForeignKey(FoodItem, on_delete=models.CASCADE, related_name='reviews', db_constraint=False)
+    customer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='reviews', db_constraint=False)
     order = models.ForeignKey('Order', on_delete=models.SET_NULL, null=True, blank=True, related_name='reviews')
     rating = models.PositiveSmallIntegerField(choices=RATING_CHOICES)
     text = models.TextField()
@@ -97,11 +151,43 @@ class Review(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        constraints = [
+            # One review per customer per dish
+            models.UniqueConstraint(fields=['food_item', 'customer'], name='core_review_item_customer_uniq'),
+        ]
 
     def __str__(self):
         return f"{self.rating}★ for {self.food_item.name} by {self.customer.get_full_name() or self.customer.email}"
 
 
+class DeliverySlot(models.Model):
+    """A chef's delivery window; orders claim one place each until capacity is reached (core.slots)."""
+    chef = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='delivery_slots')
+    start = models.DateTimeField()
+    end = models.DateTimeField()
+    capacity = models.PositiveIntegerField(default=5)
+    # Only changed with conditional UPDATEs in core.slots; never computed by counting orders
+    booked = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['start']
+        constraints = [
+            models.UniqueConstraint(fields=['chef', 'start'], name='core_deliveryslot_chef_start_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.chef} {self.label} ({self.booked}/{self.capacity})"
+
+    @property
+    def label(self):
+        start, end = timezone.localtime(self.start), timezone.localtime(self.end)
+        return f"{start:%a %b %d, %H:%M}–{end:%H:%M}"
+
+    @property
+    def remaining(self):
+        return max(self.capacity - self.booked, 0)
+
+
 class Order(models.Model):
     DISH_CHOICES = [
         ('thali', 'Homemade Thali'),
@@ -116,10 +202,19 @@ class Order(models.Model):
         ('delivered', 'Delivered'),
         ('cancelled', 'Cancelled'),
     ]
+    # Status changes a chef may make (core.transitions); delivered and cancelled are final
+    TRANSITIONS = {
+        'pending': ('confirmed', 'preparing', 'cancelled'),
+        'confirmed': ('preparing', 'delivered', 'cancelled'),
+        'preparing': ('delivered', 'cancelled'),
+        'delivered': (),
+        'cancelled': (),
+    }
 
-    chef = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='orders_received', null=True, blank=True)
-    customer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='orders_placed')
-    food_item = models.ForeignKey(FoodItem, on_delete=models.SET_NULL, null=True, blank=True, related_name='orders')
+    # Orders may live on a shard (core.sharding), so no database-level constraints to default's tables
+    chef = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='orders_received', null=True, blank=True, db_constraint=False)
+    customer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='orders_placed', db_constraint=False)
+    food_item = models.ForeignKey(FoodItem, on_delete=models.SET_NULL, null=True, blank=True, related_name='orders', db_constraint=False)
 
     name = models.CharField(max_length=200)
     phone = models.CharField(max_length=20)
@@ -128,9 +223,14 @@ class Order(models.Model):
     quantity = models.PositiveIntegerField(default=1)
     total = models.CharField(max_length=50)
     delivery_time = models.CharField(max_length=100, blank=True)
+    delivery_slot = models.ForeignKey(DeliverySlot, on_delete=models.SET_NULL, null=True, blank=True, related_name='orders', db_constraint=False)
     notes = models.TextField(blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
+    # One-time token from the order form; unique so a replayed submit can never create a second order
+    idempotency_key = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
+    # Set by the reduce_servings_bulk job when it takes this order's servings off its dish, so a rerun skips it
+    servings_reduced = models.BooleanField(default=False, editable=False)
 
     class Meta:
         ordering = ['-created_at']
@@ -138,3 +238,101 @@ class Order(models.Model):
     def __str__(self):
         dish_name = self.food_item.name if self.food_item else (self.get_dish_display() if self.dish else 'Order')
         return f"Order #{self.id} - {dish_name} by {self.name}"
+
+    @classmethod
+    def statuses_before(cls, status):
+        """Statuses an order may move to `status` from."""
+        return [source for source, targets in cls.TRANSITIONS.items() if status in targets]
+
+    def next_status_choices(self):
+        """(value, label) for the current status and every status it may move to."""
+        allowed = {self.status, *self.TRANSITIONS.get(self.status, ())}
+        return [(value, label) for value, label in self.STATUS_CHOICES if value in allowed]
+
+
+class Job(models.Model):
+    """Background job stored in our own database; see core.jobs for enqueueing and running."""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    priority = models.SmallIntegerField(default=0, help_text='Higher runs first.')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_after = models.DateTimeField()
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Matches the claim query: WHERE status='queued' AND run_after <= now ORDER BY priority DESC, run_after
+            models.Index(fields=['status', '-priority', 'run_after'], name='core_job_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job #{self.id} {self.name} ({self.status})"
+
+
+class Favorite(models.Model):
+    """Per-customer projection of delivered orders: one row per dish, ranked by frequency and recency (core.favorites)."""
+    customer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='favorites')
+    food_item = models.ForeignKey(FoodItem, on_delete=models.CASCADE, related_name='favorited_by')
+    last_order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', db_constraint=False)
+    order_count = models.PositiveIntegerField(default=0)
+    score = models.FloatField(default=0)
+    last_ordered_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-score']
+        constraints = [
+            models.UniqueConstraint(fields=['customer', 'food_item'], name='core_favorite_customer_item_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['customer', '-score'], name='core_favorite_top_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.customer} ♥ {self.food_item.name} ({self.order_count}x)"
+
+
+class SalesRollup(models.Model):
+    """Per-chef, per-dish order and review totals for one hour or day (core.analytics)."""
+    GRAIN_CHOICES = [
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+    ]
+
+    chef = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='sales_rollups')
+    # Kept (as NULL) when the dish is deleted so the chef's totals don't change
+    food_item = models.ForeignKey(FoodItem, on_delete=models.SET_NULL, null=True, blank=True, related_name='sales_rollups')
+    grain = models.CharField(max_length=4, choices=GRAIN_CHOICES)
+    bucket = models.DateTimeField(help_text='Start of the hour/day (local time)')
+    orders = models.PositiveIntegerField(default=0)
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # Signed: a status change on an order placed before the rollup existed can take these below 0 until a backfill
+    delivered = models.IntegerField(default=0)
+    cancelled = models.IntegerField(default=0)
+    reviews = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['chef', 'food_item', 'grain', 'bucket'], name='core_salesrollup_key_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['chef', 'grain', 'bucket'], name='core_salesrollup_range_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.chef} {self.grain} {self.bucket:%Y-%m-%d %H:%M}"
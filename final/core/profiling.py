@@ -0,0 +1,129 @@
+"""
+Opt-in template render profiling.
+
+Set TEMPLATE_PROFILING=1 in the environment to time every template render and
+every {% block %} render. Timings are kept per process and per request:
+
+- TemplateProfilingMiddleware adds a Server-Timing header with the slowest
+  templates/blocks of each response (visible in the browser dev tools).
+- `python manage.py bench_templates` renders the listing pages with synthetic
+  rows and prints the same breakdown, so regressions show up in benchmarks.
+
+Block timings include the time of any blocks/templates nested inside them.
+"""
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.template.base import Template
+from django.template.loader_tags import BlockNode
+
+_enabled = False
+_lock = threading.Lock()
+_totals = defaultdict(lambda: [0, 0.0])  # key -> [calls, seconds], whole process
+_local = threading.local()
+
+
+def _record(key, seconds):
+    with _lock:
+        entry = _totals[key]
+        entry[0] += 1
+        entry[1] += seconds
+    current = getattr(_local, 'stats', None)
+    if current is not None:
+        entry = current[key]
+        entry[0] += 1
+        entry[1] += seconds
+
+
+def _timed(method, key_for):
+    def wrapper(self, context, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(self, context, *args, **kwargs)
+        finally:
+            _record(key_for(self, context), time.perf_counter() - started)
+    wrapper.__wrapped__ = method
+    return wrapper
+
+
+def _template_key(template, context):
+    return f'template:{template.origin.template_name or template.name or "<string>"}'
+
+
+def _block_key(block, context):
+    # context.template_name is the page being rendered, so blocks are split per page
+    return f'block:{context.template_name or "<string>"}:{block.name}'
+
+
+def enable():
+    """Wrap Template._render and BlockNode.render with timers (safe to call more than once)."""
+    global _enabled
+    with _lock:
+        if _enabled:
+            return
+        Template._render = _timed(Template._render, _template_key)
+        BlockNode.render = _timed(BlockNode.render, _block_key)
+        _enabled = True
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    with _lock:
+        _totals.clear()
+
+
+def start_request():
+    _local.stats = defaultdict(lambda: [0, 0.0])
+
+
+def end_request():
+    stats = getattr(_local, 'stats', None)
+    _local.stats = None
+    return stats or {}
+
+
+def snapshot(stats=None):
+    """[(key, calls, total_ms, mean_ms)] sorted by total time, from `stats` or the process totals."""
+    if stats is None:
+        with _lock:
+            stats = {k: list(v) for k, v in _totals.items()}
+    rows = [
+        (key, calls, seconds * 1000, seconds * 1000 / calls)
+        for key, (calls, seconds) in stats.items() if calls
+    ]
+    return sorted(rows, key=lambda r: r[2], reverse=True)
+
+
+class TemplateProfilingMiddleware:
+    """Report per-request template/block render times in a Server-Timing header."""
+
+    max_entries = 10
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'TEMPLATE_PROFILING', False):
+            raise MiddlewareNotUsed
+        enable()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start_request()
+        try:
+            response = self.get_response(request)
+            # Template responses render lazily; make sure the timings are in before reporting them
+            if hasattr(response, 'render') and not getattr(response, 'is_rendered', True):
+                response.render()
+        finally:
+            stats = end_request()
+        entries = []
+        for n, (key, calls, total_ms, _mean) in enumerate(snapshot(stats)[:self.max_entries]):
+            desc = key.replace('"', "'")
+            entries.append(f'tpl{n};dur={total_ms:.2f};desc="{desc} x{calls}"')
+        if entries:
+            response['Server-Timing'] = ', '.join(entries)
+        return response
@@ -0,0 +1,196 @@
+"""
+Opt-in slow-query log.
+
+Set QUERY_LOG=1 in the environment to time every SQL statement run while
+serving a request (on every database, shards included; `sharding.gather`
+runs its shard queries on worker threads, which join the request's log
+through `worker_connection`):
+
+- Statements are fingerprinted: literals, placeholders and IN/VALUES lists are
+  normalized away, so `WHERE id IN (1, 2)` and `WHERE id IN (7)` count as the
+  same query. Calls and time are added up per fingerprint and per view
+  (resolver name, e.g. core:chef_dashboard), along with each view's requests.
+- A statement slower than QUERY_LOG_SLOW_MS is written out straight away with
+  its EXPLAIN plan (captured at most once a minute per fingerprint).
+- The totals are written every QUERY_LOG_FLUSH_SECONDS and when the process
+  exits.
+
+Each process appends JSON lines to QUERY_LOG_DIR/queries-<pid>.jsonl, and
+`python manage.py top_queries` adds up the files of all of them. Query
+parameters are never logged, only the SQL with its placeholders.
+"""
+import atexit
+import contextvars
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack, nullcontext
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+EXPLAIN_EVERY = 60  # seconds between plans of the same fingerprint, per process
+EXPLAINABLE = ('select', 'with', 'insert', 'update', 'delete')
+
+_lock = threading.Lock()
+_queries = defaultdict(lambda: [0, 0.0])  # (view, fingerprint) -> [calls, seconds] since the last flush
+_views = defaultdict(lambda: [0, 0.0])  # view -> [requests, seconds] since the last flush
+_sql = {}  # fingerprint -> normalized SQL
+_explained = {}  # fingerprint -> when its plan was last captured
+_last_flush = time.monotonic()
+_local = threading.local()
+# View of the request being logged ('-' until process_view), None outside one. A context variable rather
+# than a thread-local so worker threads started with the request's context (sharding.gather) see it.
+_view = contextvars.ContextVar('querylog_view', default=None)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDER = re.compile(r'%s|\?')
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_ROWS = re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+')
+_SPACE = re.compile(r'\s+')
+
+
+def normalize(sql):
+    """SQL with every literal, placeholder and value list replaced, e.g. `WHERE "id" IN (...)`."""
+    sql = _STRING.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _LIST.sub('(...)', sql)
+    sql = _ROWS.sub('(...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def fingerprint(normalized):
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12]
+
+
+def _write(records):
+    path = Path(settings.QUERY_LOG_DIR) / f'queries-{os.getpid()}.jsonl'
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+
+
+def flush(force=False):
+    """Write the totals gathered since the last flush (only every QUERY_LOG_FLUSH_SECONDS unless forced)."""
+    global _last_flush
+    with _lock:
+        if not force and time.monotonic() - _last_flush < settings.QUERY_LOG_FLUSH_SECONDS:
+            return
+        queries, views = dict(_queries), dict(_views)
+        _queries.clear()
+        _views.clear()
+        _last_flush = time.monotonic()
+    now, pid = time.time(), os.getpid()
+    records = [
+        {'type': 'view', 'ts': now, 'pid': pid, 'view': view, 'requests': requests, 'ms': round(seconds * 1000, 3)}
+        for view, (requests, seconds) in views.items()
+    ]
+    records += [
+        {'type': 'query', 'ts': now, 'pid': pid, 'view': view, 'fingerprint': fp, 'sql': _sql[fp],
+         'calls': calls, 'ms': round(seconds * 1000, 3)}
+        for (view, fp), (calls, seconds) in queries.items()
+    ]
+    if records:
+        _write(records)
+
+
+def _explain(connection, sql, params):
+    _local.explaining = True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+            return [' '.join(str(column) for column in row) for row in cursor.fetchall()]
+    except Exception as e:
+        return [f'EXPLAIN failed: {e}']
+    finally:
+        _local.explaining = False
+
+
+def _record(connection, sql, params, many, seconds, succeeded):
+    normalized = normalize(sql)
+    fp = fingerprint(normalized)
+    view = _view.get() or '-'
+    with _lock:
+        entry = _queries[view, fp]
+        entry[0] += 1
+        entry[1] += seconds
+        _sql.setdefault(fp, normalized)
+    ms = seconds * 1000
+    if ms < settings.QUERY_LOG_SLOW_MS:
+        return
+    plan = None
+    now = time.monotonic()
+    # Only after success: a failed statement may have aborted the transaction (PostgreSQL)
+    if succeeded and not many and sql.lstrip().lower().startswith(EXPLAINABLE):
+        with _lock:
+            due = now - _explained.get(fp, -EXPLAIN_EVERY) >= EXPLAIN_EVERY
+            if due:
+                _explained[fp] = now
+        if due:
+            plan = _explain(connection, sql, params)
+    _write([{
+        'type': 'slow', 'ts': time.time(), 'pid': os.getpid(), 'view': view, 'fingerprint': fp,
+        'database': connection.alias, 'sql': normalized, 'ms': round(ms, 3), 'explain': plan,
+    }])
+
+
+def _execute(execute, sql, params, many, context):
+    if getattr(_local, 'explaining', False):
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    succeeded = False
+    try:
+        result = execute(sql, params, many, context)
+        succeeded = True
+        return result
+    finally:
+        _record(context['connection'], sql, params, many, time.perf_counter() - started, succeeded)
+
+
+def worker_connection(connection):
+    """Time `connection`'s queries if this thread runs in a logged request's context (e.g. a gather worker)."""
+    return connection.execute_wrapper(_execute) if _view.get() is not None else nullcontext()
+
+
+class QueryLogMiddleware:
+    """Time the SQL run by each request and attribute it to the view that handled it."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_LOG', False):
+            raise MiddlewareNotUsed
+        atexit.register(flush, force=True)
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _view.set('-')  # set in process_view; queries before that (e.g. sessions) count under '-'
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_execute))
+                response = self.get_response(request)
+                # Template responses render lazily; their queries belong to this request too
+                if hasattr(response, 'render') and not getattr(response, 'is_rendered', True):
+                    response.render()
+        finally:
+            view = _view.get()
+            _view.reset(token)
+            with _lock:
+                entry = _views[view]
+                entry[0] += 1
+                entry[1] += time.perf_counter() - started
+            flush()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        _view.set(match.view_name if match else view_func.__name__)
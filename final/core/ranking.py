@@ -0,0 +1,211 @@
+"""
+Ranking scores for food items and chefs.
+
+Two scores are stored on FoodItem and CustomUser (chefs) so listings can sort
+with a plain ORDER BY ... LIMIT on an indexed column:
+
+- rating_score: Bayesian average of review ratings. Items with few reviews are
+  pulled towards PRIOR_RATING, so one 5-star review does not beat fifty 4.8s.
+- trending_score: log of order volume where each order's weight halves every
+  TRENDING_HALF_LIFE. Weights are measured against a fixed EPOCH instead of
+  "now", so every row decays at the same rate and the stored values stay
+  comparable without rewriting the whole table as time passes.
+
+Scores are updated incrementally as orders/reviews arrive (see core.signals),
+ratings are recounted when a review is edited or deleted, and everything can be
+rebuilt from scratch with `python manage.py recompute_rankings`.
+"""
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, FloatField, Sum, Value
+from django.db.models.functions import Abs, Cast, Exp, Greatest, Ln
+from django.utils import timezone
+
+from . import sharding
+from .models import FoodItem, Order, Review
+
+User = get_user_model()
+
+PRIOR_RATING = 3.5
+PRIOR_WEIGHT = 5.0
+TRENDING_HALF_LIFE = timedelta(days=7)
+EPOCH = datetime(2020, 1, 1, tzinfo=dt_timezone.utc)
+DECAY_RATE = math.log(2) / TRENDING_HALF_LIFE.total_seconds()
+
+# ?sort= values accepted by the listing views
+SORT_ORDERINGS = {
+    'trending': ('-trending_score', '-created_at'),
+    'top': ('-rating_score', '-created_at'),
+    'new': ('-created_at',),
+}
+CHEF_SORT_ORDERINGS = {
+    'trending': ('-trending_score', '-date_joined'),
+    'top': ('-rating_score', '-date_joined'),
+    'new': ('-date_joined',),
+}
+DEFAULT_SORT = 'trending'
+
+
+def resolve_sort(value):
+    """Return a valid sort key for a ?sort= query value."""
+    return value if value in SORT_ORDERINGS else DEFAULT_SORT
+
+
+def order_weight(quantity, when):
+    """Log-weight of one order: log(quantity) plus its decay offset from EPOCH."""
+    return math.log(max(quantity or 1, 1)) + DECAY_RATE * (when - EPOCH).total_seconds()
+
+
+def logaddexp_expr(column, weight):
+    """SQL for log(exp(column) + exp(weight)), computed stably inside the UPDATE."""
+    weight = Value(weight, output_field=FloatField())
+    col = Cast(F(column), FloatField())
+    return Greatest(col, weight) + Ln(Value(1.0) + Exp(-Abs(col - weight)))
+
+
+def _rating_update(rating):
+    count = F('rating_count') + 1
+    total = F('rating_sum') + rating
+    return {
+        'rating_count': count,
+        'rating_sum': total,
+        'rating_score': Cast(
+            (Value(PRIOR_WEIGHT * PRIOR_RATING) + total) / (Value(PRIOR_WEIGHT) + count),
+            FloatField(),
+        ),
+    }
+
+
+def record_order(order):
+    """Add a new order to the trending score of its food item and chef."""
+    weight = order_weight(order.quantity, order.created_at or timezone.now())
+    if order.food_item_id:
+        FoodItem.objects.filter(id=order.food_item_id).update(trending_score=logaddexp_expr('trending_score', weight))
+    if order.chef_id:
+        User.objects.filter(id=order.chef_id).update(trending_score=logaddexp_expr('trending_score', weight))
+
+
+def record_review(review):
+    """Add a new review to the rating of its food item and the item's chef."""
+    FoodItem.objects.filter(id=review.food_item_id).update(version=F('version') + 1, **_rating_update(review.rating))
+    User.objects.filter(food_items=review.food_item_id).update(**_rating_update(review.rating))
+
+
+def _set_rating(queryset, reviews, **extra):
+    totals = reviews.aggregate(count=Count('id'), total=Sum('rating'))
+    count, total = totals['count'], totals['total'] or 0
+    score = (PRIOR_WEIGHT * PRIOR_RATING + total) / (PRIOR_WEIGHT + count) if count else 0.0
+    queryset.update(rating_count=count, rating_sum=total, rating_score=score, **extra)
+
+
+def recount_chef(chef_id):
+    """Recount a chef's rating from the reviews of their remaining dishes."""
+    item_ids = list(FoodItem.objects.filter(chef_id=chef_id).values_list('id', flat=True))
+    reviews = Review.objects.using(sharding.shard_for(chef_id)).filter(food_item_id__in=item_ids)
+    _set_rating(User.objects.filter(id=chef_id), reviews)
+
+
+def recount_review(review):
+    """
+    Recount the rating of an edited or deleted review's food item and chef.
+
+    Unlike record_review this can't add a delta: the old rating is gone by now.
+    """
+    chef_id = FoodItem.objects.filter(id=review.food_item_id).values_list('chef_id', flat=True).first()
+    if chef_id is None:
+        return  # the dish is being deleted too; its chef is recounted once it's gone
+    reviews = Review.objects.using(sharding.shard_for(chef_id)).filter(food_item_id=review.food_item_id)
+    _set_rating(FoodItem.objects.filter(id=review.food_item_id), reviews, version=F('version') + 1)
+    recount_chef(chef_id)
+
+
+def _group_logsumexp(np, idx, logw, size):
+    """Per-group log(sum(exp(logw))); groups without rows get 0."""
+    peak = np.full(size, -np.inf)
+    np.maximum.at(peak, idx, logw)
+    acc = np.zeros(size)
+    np.add.at(acc, idx, np.exp(logw - peak[idx]))
+    out = np.zeros(size)
+    has_rows = acc > 0
+    out[has_rows] = peak[has_rows] + np.log(acc[has_rows])
+    return out
+
+
+def _positions(np, ids, owners):
+    """Index of each owner id in sorted `ids`, plus a mask dropping owners not in `ids`."""
+    owners = np.asarray(owners, dtype=np.int64)
+    idx = np.minimum(np.searchsorted(ids, owners), max(len(ids) - 1, 0))
+    known = ids[idx] == owners if len(ids) else np.zeros(len(owners), dtype=bool)
+    return idx[known], known
+
+
+def _compute(np, ids, order_rows, review_rows):
+    """Vectorized scores for `ids` from (owner_id, quantity, created_at) and (owner_id, rating) rows."""
+    ids = np.asarray(ids, dtype=np.int64)
+    size = len(ids)
+    trending = np.zeros(size)
+    counts = np.zeros(size, dtype=np.int64)
+    sums = np.zeros(size, dtype=np.int64)
+    if order_rows:
+        owner, qty, created = zip(*order_rows)
+        idx, known = _positions(np, ids, owner)
+        seconds = np.array([(c - EPOCH).total_seconds() for c in created])
+        logw = np.log(np.maximum(np.asarray(qty, dtype=np.float64), 1.0)) + DECAY_RATE * seconds
+        logw = logw[known]
+        trending = _group_logsumexp(np, idx, logw, size)
+    if review_rows:
+        owner, rating = zip(*review_rows)
+        idx, known = _positions(np, ids, owner)
+        counts = np.bincount(idx, minlength=size)
+        sums = np.bincount(idx, weights=np.asarray(rating, dtype=np.float64)[known], minlength=size).astype(np.int64)
+    # Unreviewed rows keep 0 so they sort below anything rated, same as a fresh row
+    scores = np.where(counts > 0, (PRIOR_WEIGHT * PRIOR_RATING + sums) / (PRIOR_WEIGHT + counts), 0.0)
+    return trending, counts, sums, scores
+
+
+def _apply(queryset, ids, trending, counts, sums, scores, batch_size):
+    pos = {obj_id: n for n, obj_id in enumerate(ids)}
+    objs = list(queryset.filter(id__in=list(ids)).only('id'))
+    for obj in objs:
+        n = pos[obj.id]
+        obj.trending_score = float(trending[n])
+        obj.rating_count = int(counts[n])
+        obj.rating_sum = int(sums[n])
+        obj.rating_score = float(scores[n])
+    fields = ['trending_score', 'rating_count', 'rating_sum', 'rating_score']
+    queryset.model.objects.bulk_update(objs, fields, batch_size=batch_size)
+    return len(objs)
+
+
+def _rows(queryset):
+    return [row for shard_queryset in sharding.each(queryset.order_by()) for row in shard_queryset]
+
+
+def recompute_all(batch_size=500):
+    """Rebuild every food item and chef score from the full Order/Review history."""
+    import numpy as np
+
+    item_ids = list(FoodItem.objects.order_by('id').values_list('id', flat=True))
+    reviews = _rows(Review.objects.values_list('food_item_id', 'rating'))
+    item_scores = _compute(
+        np,
+        item_ids,
+        _rows(Order.objects.filter(food_item__isnull=False).values_list('food_item_id', 'quantity', 'created_at')),
+        reviews,
+    )
+    # Orders and reviews may be on shards, away from the user and dish tables: map dishes to chefs here.
+    # _compute drops rows whose owner isn't in chef_ids (i.e. isn't a chef).
+    chef_ids = list(User.objects.filter(user_type='chef').order_by('id').values_list('id', flat=True))
+    item_chefs = dict(FoodItem.objects.values_list('id', 'chef_id'))
+    chef_scores = _compute(
+        np,
+        chef_ids,
+        _rows(Order.objects.filter(chef__isnull=False).values_list('chef_id', 'quantity', 'created_at')),
+        [(item_chefs[item_id], rating) for item_id, rating in reviews if item_id in item_chefs],
+    )
+    items = _apply(FoodItem.objects.all(), item_ids, *item_scores, batch_size=batch_size)
+    FoodItem.objects.update(version=F('version') + 1)
+    chefs = _apply(User.objects.all(), chef_ids, *chef_scores, batch_size=batch_size)
+    return items, chefs
@@ -0,0 +1,235 @@
+"""
+Chef-keyed sharding of orders and reviews.
+
+With DJANGO_SHARDS=N (settings.SHARDS) the Order and Review rows live in N
+more databases; users, dishes, slots, jobs and everything else stay in
+'default'. All of one chef's rows are on one shard, picked by a consistent-hash
+ring over the shard aliases (`shard_for`), so adding a shard moves only about
+1/N of the chefs (`python manage.py rebalance_shards`).
+
+- Chef-scoped queries name their shard: Order.objects.using(shard_for(chef.id)).
+  Queries through a related object (food_item.reviews, chef.orders_received,
+  order.customer) are routed from that object by ChefShardRouter.
+- Cross-chef reads (a customer's orders, a lookup by order id, rebuilds) run
+  on every shard: `gather` merges the rows (querying shards in parallel),
+  `find` returns the first match and `each` hands out one queryset per shard.
+- Sharded rows can't be joined to tables in another database: use
+  prefetch_related rather than select_related, and dish ids rather than
+  food_item__chef lookups. Their foreign keys to default's tables have no
+  database constraint for the same reason, and deleting a user, dish or
+  slot applies on_delete to the shards' rows in `delete_related`.
+- Each shard hands out ids from its own block of ID_BLOCK (`reserve_id_block`,
+  run after migrate), so order and review ids stay unique across shards and
+  rows keep their id when they move. The ids are 64-bit (BigAutoField) and the
+  block is set through sqlite_sequence, so shards must be SQLite databases.
+
+Without shards every alias here is 'default' and nothing changes.
+"""
+import bisect
+import contextvars
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
+
+from . import querylog
+from .models import CustomUser, FoodItem, Order, Review
+
+VNODES = 64
+ID_BLOCK = 10 ** 12  # shard n (0-based) numbers its rows from (n + 1) * ID_BLOCK; default keeps the ids below
+SHARDED_MODELS = (Order, Review)
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.md5(str(key).encode()).digest()[:8], 'big')
+
+
+class HashRing:
+    """Consistent-hash ring: each node owns `vnodes` points and a key belongs to the next point clockwise."""
+
+    def __init__(self, nodes, vnodes=VNODES):
+        points = sorted((_hash(f'{node}#{n}'), node) for node in nodes for n in range(vnodes))
+        self._hashes = [h for h, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node_for(self, key):
+        i = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._nodes[i]
+
+
+@lru_cache(maxsize=None)
+def _ring(shards):
+    return HashRing(shards)
+
+
+def enabled():
+    return bool(settings.SHARDS)
+
+
+def aliases():
+    """Databases holding orders and reviews."""
+    return list(settings.SHARDS) or [DEFAULT_DB_ALIAS]
+
+
+def shard_for(chef_id):
+    """Alias of the database holding the chef's orders and reviews (orders without a chef: key 0)."""
+    if not settings.SHARDS:
+        return DEFAULT_DB_ALIAS
+    return _ring(tuple(settings.SHARDS)).node_for(chef_id or 0)
+
+
+def shard_of(instance):
+    """Shard for rows belonging to `instance` (an order, review, dish or chef); None if it can't tell."""
+    if isinstance(instance, SHARDED_MODELS) and instance._state.db:
+        return instance._state.db
+    if isinstance(instance, (Order, FoodItem)):
+        return shard_for(instance.chef_id)
+    if isinstance(instance, Review):
+        return shard_for(instance.food_item.chef_id)
+    if isinstance(instance, CustomUser) and instance.user_type == 'chef':
+        return shard_for(instance.id)
+    return None
+
+
+class ChefShardRouter:
+    """Sends Order/Review queries to the shard of the object they were reached from, everything else to default."""
+
+    def db_for_read(self, model, **hints):
+        if not issubclass(model, SHARDED_MODELS):
+            # Not None: Django would fall back to the hinted instance's database, which may be a shard
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        return shard_of(instance) if instance is not None else None
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Every database gets the full schema; shards just leave the other tables empty
+        return None
+
+
+def _fetch(queryset, alias):
+    try:
+        with querylog.worker_connection(connections[alias]):
+            return list(queryset.using(alias))
+    finally:
+        connections.close_all()  # this worker thread's connections
+
+
+def _sort_value(row, field):
+    return row[field] if isinstance(row, dict) else getattr(row, field)
+
+
+def gather(queryset, order_by=(), limit=None):
+    """
+    Run `queryset` on every shard and merge the rows (model instances or values() dicts).
+
+    `order_by` ('-created_at', ...) orders each shard's rows and the merged list; `limit` caps both.
+    """
+    if order_by:
+        queryset = queryset.order_by(*order_by)
+    if limit is not None:
+        queryset = queryset[:limit]
+    shards = aliases()
+    if len(shards) == 1:
+        rows = list(queryset.using(shards[0]))
+    else:
+        with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+            # Each worker runs in a copy of this thread's context, so the query log can follow it
+            futures = [pool.submit(contextvars.copy_context().run, _fetch, queryset, alias) for alias in shards]
+            rows = [row for future in futures for row in future.result()]
+    for field in reversed(order_by):
+        rows.sort(key=lambda row: _sort_value(row, field.lstrip('-')), reverse=field.startswith('-'))
+    return rows if limit is None else rows[:limit]
+
+
+def find(queryset):
+    """First row matching `queryset` on any shard, or None (e.g. an order by id)."""
+    rows = gather(queryset, limit=1)
+    return rows[0] if rows else None
+
+
+def each(queryset):
+    """`queryset` once per shard, for scans that walk every order or review."""
+    return [queryset.using(alias) for alias in aliases()]
+
+
+def delete_related(instance):
+    """Apply on_delete to shard rows pointing at a deleted default row (Django only looks in its own database)."""
+    for model in SHARDED_MODELS:
+        for field in model._meta.concrete_fields:
+            if not field.is_relation or not isinstance(instance, field.related_model) or issubclass(field.related_model, SHARDED_MODELS):
+                continue
+            for alias in settings.SHARDS:
+                rows = model.objects.using(alias).filter(**{field.attname: instance.pk})
+                if field.remote_field.on_delete is models.CASCADE:
+                    rows.delete()
+                elif field.remote_field.on_delete is models.SET_NULL:
+                    rows.update(**{field.attname: None})
+
+
+def reserve_id_block(alias):
+    """Continue the shard's order and review ids in its own block (SQLite shards)."""
+    if alias not in settings.SHARDS:
+        return
+    connection = connections[alias]
+    if connection.vendor != 'sqlite':
+        # Other backends keep their counters in sequences; without this the shards would hand out the same ids
+        raise ImproperlyConfigured(
+            f'Shard {alias!r} uses the {connection.vendor} backend, but shard id blocks are only set up on SQLite.'
+        )
+    start = (settings.SHARDS.index(alias) + 1) * ID_BLOCK
+    with connection.cursor() as cursor:
+        for model in SHARDED_MODELS:
+            table = model._meta.db_table
+            # Rows moved in from other shards keep their ids, so only look at this block
+            cursor.execute(
+                f'SELECT MAX(id) FROM {connection.ops.quote_name(table)} WHERE id >= %s AND id < %s',
+                [start, start + ID_BLOCK],
+            )
+            last = cursor.fetchone()[0] or start
+            cursor.execute('DELETE FROM sqlite_sequence WHERE name = %s', [table])
+            cursor.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)', [table, last])
+
+
+def misplaced(chef_id=None):
+    """[(chef_id, source, target)] for chefs with rows off the shard the ring puts them on (default included)."""
+    item_chefs = dict(FoodItem.objects.values_list('id', 'chef_id'))
+    moves = []
+    for alias in [DEFAULT_DB_ALIAS, *settings.SHARDS]:
+        orders = Order.objects.using(alias).order_by()
+        reviews = Review.objects.using(alias).order_by()
+        if chef_id is not None:
+            orders = orders.filter(chef_id=chef_id)
+            reviews = reviews.filter(food_item_id__in=[item for item, chef in item_chefs.items() if chef == chef_id])
+        chef_ids = set(orders.values_list('chef_id', flat=True).distinct())
+        chef_ids |= {item_chefs[item] for item in reviews.values_list('food_item_id', flat=True).distinct() if item in item_chefs}
+        moves += [(chef, alias, shard_for(chef)) for chef in sorted(chef_ids, key=lambda c: c or 0) if shard_for(chef) != alias]
+    return moves
+
+
+def move_chef(chef_id, source, target, batch_size=500):
+    """
+    Copy the chef's orders and reviews from `source` to `target` (ids kept), then delete them from `source`.
+    Safe to re-run after an interruption. Returns (orders, reviews) moved.
+    """
+    item_ids = list(FoodItem.objects.filter(chef_id=chef_id).values_list('id', flat=True))
+    orders = list(Order.objects.using(source).filter(chef_id=chef_id))
+    reviews = list(Review.objects.using(source).filter(food_item_id__in=item_ids))
+    with transaction.atomic(using=target):
+        # Orders first: reviews point at them
+        Order.objects.using(target).bulk_create(orders, batch_size=batch_size, ignore_conflicts=True)
+        Review.objects.using(target).bulk_create(reviews, batch_size=batch_size, ignore_conflicts=True)
+        reserve_id_block(target)
+    with transaction.atomic(using=source):
+        for model, rows in ((Review, reviews), (Order, orders)):
+            ids = [row.id for row in rows]
+            for start in range(0, len(ids), batch_size):
+                model.objects.using(source).filter(id__in=ids[start:start + batch_size]).delete()
+    return len(orders), len(reviews)
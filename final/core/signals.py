@@ -0,0 +1,71 @@
+import logging
+
+from django.db import DatabaseError, transaction
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from . import analytics, chef_pages, ranking, sharding
+from .models import CustomUser, DeliverySlot, FoodItem, Order, Review
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=Order)
+def order_created(sender, instance, created, **kwargs):
+    if created:
+        # After default commits: inside the order's transaction these UPDATEs would hold its write lock through the
+        # slot claim, and a failed count must not undo a placed order
+        transaction.on_commit(lambda: _count_order(instance))
+
+
+def _count_order(order):
+    try:
+        ranking.record_order(order)
+        analytics.record_order(order)
+    except DatabaseError:
+        # recompute_rankings and backfill_analytics bring the totals back in line
+        logger.exception('Could not count order %s in the rankings and sales totals', order.id)
+
+
+@receiver(post_save, sender=Review)
+def review_created(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        ranking.record_review(instance)
+        analytics.record_review(instance)
+    elif update_fields is None or 'rating' in update_fields:
+        ranking.recount_review(instance)
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    ranking.recount_review(instance)
+
+
+@receiver([post_save, post_delete], sender=FoodItem)
+def food_item_changed(sender, instance, **kwargs):
+    chef_pages.invalidate(instance.chef_id)
+
+
+@receiver([post_save, post_delete], sender=Review)
+def review_changed(sender, instance, **kwargs):
+    chef_pages.invalidate_for_items(instance.food_item_id)
+
+
+@receiver(post_migrate)
+def shard_migrated(sender, using, **kwargs):
+    if sender.name == 'core':
+        sharding.reserve_id_block(using)
+
+
+@receiver(post_delete, sender=CustomUser)
+@receiver(post_delete, sender=FoodItem)
+@receiver(post_delete, sender=DeliverySlot)
+def sharded_rows_orphaned(sender, instance, **kwargs):
+    if sharding.enabled():
+        sharding.delete_related(instance)
+
+
+# After sharded_rows_orphaned, so the dish's reviews on a shard are gone too
+@receiver(post_delete, sender=FoodItem)
+def food_item_deleted(sender, instance, **kwargs):
+    ranking.recount_chef(instance.chef_id)
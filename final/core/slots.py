@@ -0,0 +1,72 @@
+"""
+Delivery slots: bookable delivery windows per chef, each with a capacity.
+
+DeliverySlot.booked is a counter, changed only with conditional UPDATEs:
+
+    UPDATE core_deliveryslot SET booked = booked + 1
+    WHERE id = %s AND chef_id = %s AND booked < capacity AND start >= %s
+
+The database checks capacity and increments in one statement, locking just
+that row (PostgreSQL; SQLite serializes all writes anyway), so concurrent
+checkouts for the same slot can never overbook it and never wait on each
+other for longer than that statement and its transaction. The order view
+claims last, right before committing, to keep that window short.
+
+Cancelled orders give their place back (core.transitions).
+"""
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import DeliverySlot
+
+SLOT_LENGTH = timedelta(hours=1)
+LEAD_TIME = timedelta(minutes=45)  # last moment a slot can still be booked, before its start
+BOOKING_WINDOW = timedelta(days=2)
+
+
+class SlotFull(Exception):
+    """The slot filled up (or closed) before this order could claim it."""
+
+
+def bookable(chef):
+    """The chef's upcoming slots that can still be booked, soonest first (full ones included, to show them)."""
+    now = timezone.now()
+    return DeliverySlot.objects.filter(chef=chef, start__gte=now + LEAD_TIME, start__lt=now + BOOKING_WINDOW).order_by('start')
+
+
+def claim(chef, slot_id):
+    """Take one place in the slot. Raises SlotFull if there is none left; call inside the order's transaction."""
+    claimed = DeliverySlot.objects.filter(
+        id=slot_id, chef=chef, booked__lt=F('capacity'), start__gte=timezone.now() + LEAD_TIME,
+    ).update(booked=F('booked') + 1)
+    if not claimed:
+        raise SlotFull(slot_id)
+
+
+def release(slot_ids):
+    """Give back one place per id in `slot_ids` (repeats allowed), in one UPDATE."""
+    counts = Counter(slot_id for slot_id in slot_ids if slot_id)
+    if not counts:
+        return
+    returned = Case(*[When(id=slot_id, then=Value(n)) for slot_id, n in counts.items()], default=Value(0))
+    DeliverySlot.objects.filter(id__in=counts).update(booked=Greatest(F('booked') - returned, Value(0)))
+
+
+def open_slots(chef, first_day, days, from_hour, to_hour, capacity):
+    """Create (or resize) hourly slots from from_hour to to_hour on `days` days starting at first_day."""
+    slots = []
+    for n in range(days):
+        day = first_day + timedelta(days=n)
+        start = timezone.make_aware(datetime.combine(day, time(from_hour)))
+        last = timezone.make_aware(datetime.combine(day, time(to_hour)))
+        while start + SLOT_LENGTH <= last:
+            slots.append(DeliverySlot(chef=chef, start=start, end=start + SLOT_LENGTH, capacity=capacity))
+            start += SLOT_LENGTH
+    DeliverySlot.objects.bulk_create(
+        slots, update_conflicts=True, unique_fields=['chef', 'start'], update_fields=['capacity'],
+    )
+    return len(slots)
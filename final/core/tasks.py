@@ -0,0 +1,101 @@
+"""Background tasks run by `manage.py run_workers` (see core.jobs)."""
+import os
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Greatest
+
+from . import chef_pages, favorites, sharding
+from .jobs import task
+from .models import FoodItem, Order
+
+# Uploads are written here during the request (local disk, fast) and moved into media storage by a job
+upload_staging = FileSystemStorage(location=settings.MEDIA_ROOT / 'staging')
+
+
+@task('store_food_image')
+def store_food_image(food_item_id, staged_name):
+    if not upload_staging.exists(staged_name):
+        return  # already moved by an earlier attempt
+    item = FoodItem.objects.filter(id=food_item_id).first()
+    if item is not None:
+        with upload_staging.open(staged_name) as f:
+            item.image.save(os.path.basename(staged_name), File(f), save=False)
+        item.save(update_fields=['image'])
+    upload_staging.delete(staged_name)
+
+
+@task('reduce_servings')
+def reduce_servings(food_item_id, quantity):
+    """Take delivered servings off the item; it drops out of listings at 0."""
+    _take_servings({food_item_id: quantity})
+
+
+@task('reduce_servings_bulk')
+def reduce_servings_bulk(order_ids=(), quantities=None):
+    """
+    Take the delivered orders' servings off their dishes, summed per dish in one UPDATE.
+
+    Each order is flagged servings_reduced in the same step, so running the job again (requeued after a stale
+    lease, or after a crash before it was marked done) skips the orders already counted. `quantities`
+    ({food_item_id: quantity}) is the payload of jobs queued before the flag, applied as is.
+    """
+    if quantities:
+        _take_servings({int(item_id): qty for item_id, qty in quantities.items()})  # JSON keys are strings
+    pending = Order.objects.filter(id__in=order_ids, food_item__isnull=False, servings_reduced=False)
+    for orders in sharding.each(pending):
+        # Default (the dishes) commits before the shard (the flags): if the second commit fails, a retry takes
+        # the servings off again rather than never. Without shards this is one transaction.
+        with transaction.atomic(using=orders.db), transaction.atomic():
+            rows = list(orders.select_for_update().values_list('id', 'food_item_id', 'quantity'))
+            if not rows:
+                continue
+            if orders.filter(id__in=[order_id for order_id, _, _ in rows]).update(servings_reduced=True) != len(rows):
+                # Another run of this job flagged some meanwhile (no row locks on SQLite); roll back and retry
+                raise RuntimeError('Orders were counted by another run meanwhile.')
+            quantities = defaultdict(int)
+            for _, food_item_id, quantity in rows:
+                quantities[food_item_id] += quantity
+            _take_servings(quantities)
+
+
+def _take_servings(quantities):
+    taken = Case(*[When(id=item_id, then=Value(qty)) for item_id, qty in quantities.items()], default=Value(0))
+    FoodItem.objects.filter(id__in=quantities).update(
+        servings_available=Greatest(F('servings_available') - taken, Value(0)),
+        version=F('version') + 1,
+    )
+    chef_pages.invalidate_for_items(*quantities)
+
+
+@task('notify_chef_new_order')
+def notify_chef_new_order(order_id):
+    order = sharding.find(Order.objects.prefetch_related('chef', 'food_item').filter(id=order_id))
+    if order is None or order.chef is None:
+        return
+    dish = order.food_item.name if order.food_item else (order.get_dish_display() or 'Order')
+    send_mail(
+        subject=f'New order #{order.id}: {dish} x {order.quantity}',
+        message=(
+            f'{order.name} ({order.phone}) ordered {dish} x {order.quantity} for {order.total}.\n'
+            f'Delivery: {order.delivery_time}\nAddress: {order.address}\nNotes: {order.notes or "-"}\n'
+        ),
+        from_email=None,
+        recipient_list=[order.chef.email],
+    )
+
+
+@task('record_favorite')
+def record_favorite(order_id):
+    record_favorites([order_id])
+
+
+@task('record_favorites')
+def record_favorites(order_ids):
+    for order in sharding.gather(Order.objects.filter(id__in=order_ids, status='delivered')):
+        favorites.record_delivery(order)
@@ -0,0 +1,36 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+# Star rows are built once at import; rendering a rating is then a list lookup instead of a 5-step template loop
+_STAR = '<i class="bi bi-star{}"></i>'
+STAR_ROWS = [
+    mark_safe(''.join(_STAR.format('-fill' if n < filled else '') for n in range(5)))
+    for filled in range(6)
+]
+
+
+def star_row(value):
+    """Five stars with floor(value) filled (None/invalid -> none filled)."""
+    try:
+        filled = int(float(value or 0))
+    except (TypeError, ValueError):
+        filled = 0
+    return STAR_ROWS[min(max(filled, 0), 5)]
+
+
+@register.simple_tag
+def stars(value):
+    return star_row(value)
+
+
+@register.inclusion_tag('core/includes/dish_card.html')
+def dish_card(item):
+    """Home page dish card. Wrap in {% cache ... item.id item.version item.chef.page_version %} to reuse the rendered HTML."""
+    chef = item.chef
+    return {
+        'item': item,
+        'chef_name': chef.get_full_name() or chef.email,
+        'stars': star_row(item.avg_rating),
+    }
@@ -0,0 +1,92 @@
+"""Fixtures shared by the core tests."""
+from concurrent.futures import Future
+from unittest import mock
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+from core import sharding
+from core.models import CustomUser, FoodItem, Order, Review
+
+PASSWORD = 'pass12345'
+
+# Pages render {% static %}; the manifest storage would need collectstatic first
+PLAIN_STATIC = override_settings(STORAGES={
+    **settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+
+
+def make_chef(email='chef@example.com', **fields):
+    fields.setdefault('first_name', 'Asha')
+    return CustomUser.objects.create_user(email=email, password=PASSWORD, user_type='chef', **fields)
+
+
+def make_customer(email='ram@example.com', **fields):
+    return CustomUser.objects.create_user(email=email, password=PASSWORD, **fields)
+
+
+def make_item(chef, name='Dal Bhat', **fields):
+    fields.setdefault('price', 150)
+    fields.setdefault('servings_available', 10)
+    return FoodItem.objects.create(chef=chef, name=name, **fields)
+
+
+def make_order(chef, customer, food_item=None, **fields):
+    """An order on the chef's shard; status defaults to pending."""
+    fields.setdefault('status', 'pending')
+    fields.setdefault('quantity', 1)
+    fields.setdefault('total', '₹100')
+    return Order.objects.using(sharding.shard_for(chef.id)).create(
+        chef=chef, customer=customer, food_item=food_item, name='Ram', phone='9800000000',
+        address='Baneshwor', dish='thali', **fields,
+    )
+
+
+def make_review(food_item, customer, rating=5, **fields):
+    """A review on the dish's chef's shard."""
+    fields.setdefault('text', 'Tasty')
+    return Review.objects.using(sharding.shard_for(food_item.chef_id)).create(
+        food_item=food_item, customer=customer, rating=rating, **fields,
+    )
+
+
+class _InlinePool:
+    """ThreadPoolExecutor stand-in running each call on the calling thread."""
+
+    def __init__(self, max_workers=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, func, *args):
+        future = Future()
+        future.set_result(func(*args))
+        return future
+
+
+# A TestCase's shard rows are uncommitted, so gather's worker threads (each with its own connection) can't read
+# them; query every shard on the test's connections instead. ShardedGatherTests covers the threaded path.
+INLINE_GATHER = mock.patch.multiple(
+    sharding, ThreadPoolExecutor=_InlinePool, _fetch=lambda queryset, alias: list(queryset.using(alias)),
+)
+
+
+class ShopTestCase(TestCase):
+    """A chef with one dish and a customer, on every database (orders and reviews may live on a shard)."""
+
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.enterClassContext(INLINE_GATHER)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.chef = make_chef()
+        cls.customer = make_customer()
+        cls.item = make_item(cls.chef)
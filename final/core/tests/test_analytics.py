@@ -0,0 +1,81 @@
+from datetime import timedelta
+
+from django.urls import reverse
+from django.utils import timezone
+
+from core import analytics, transitions
+from core.models import SalesRollup
+
+from .base import ShopTestCase, make_customer, make_item, make_order, make_review
+
+
+class RollupTests(ShopTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.momo = make_item(cls.chef, 'Momo')
+
+    def place(self, item, quantity=1, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return make_order(self.chef, self.customer, item, quantity=quantity, **fields)
+
+    def rows(self):
+        return list(SalesRollup.objects.order_by('grain', 'bucket', 'food_item_id').values_list(
+            'grain', 'bucket', 'food_item_id', *analytics.COUNTERS,
+        ))
+
+    def series(self, grain='hour', **kwargs):
+        now = timezone.now()
+        return analytics.series(self.chef, grain, now - timedelta(hours=3), now + timedelta(hours=1), **kwargs)
+
+    def test_orders_add_to_their_hour_and_day(self):
+        self.place(self.item, quantity=2, total='₹300')
+        self.place(self.item)
+        hour, day = (SalesRollup.objects.get(grain=grain) for grain in ('hour', 'day'))
+        for row in (hour, day):
+            self.assertEqual((row.orders, row.quantity, row.revenue), (2, 3, 400))
+        self.assertEqual(hour.bucket, analytics.bucket_start(timezone.now(), 'hour'))
+
+    def test_status_changes_move_the_counts(self):
+        order = self.place(self.item)
+        transitions.change_status(self.chef, [order.id], 'cancelled')
+        row = SalesRollup.objects.get(grain='hour')
+        self.assertEqual((row.delivered, row.cancelled), (0, 1))
+
+    def test_series_is_zero_filled_and_rates_are_per_bucket(self):
+        cancelled = self.place(self.item)
+        self.place(self.momo, quantity=4)
+        transitions.change_status(self.chef, [cancelled.id], 'cancelled')
+        make_review(self.item, make_customer('sita@example.com'), rating=4)
+        make_review(self.item, self.customer, rating=3)
+        data = self.series()
+        self.assertEqual(len(data['buckets']), 4)
+        self.assertEqual(data['series']['orders'], [0, 0, 0, 2])
+        self.assertEqual(data['series']['cancellation_rate'], [None, None, None, 0.5])
+        self.assertEqual(data['series']['avg_rating'][-1], 3.5)
+        self.assertEqual(data['totals']['quantity'], 5)
+        self.assertEqual([d['name'] for d in data['top_dishes']], ['Momo', 'Dal Bhat'])
+
+    def test_series_for_one_dish(self):
+        self.place(self.item)
+        self.place(self.momo, quantity=4)
+        self.assertEqual(self.series(food_item_id=self.momo.id)['totals']['quantity'], 4)
+
+    def test_backfill_matches_the_incremental_rows(self):
+        delivered = self.place(self.item, quantity=2, status='preparing')
+        self.place(self.momo)
+        transitions.change_status(self.chef, [delivered.id], 'delivered')
+        make_review(self.momo, self.customer, rating=4)
+        before = self.rows()
+        self.assertEqual(analytics.backfill(), 4)
+        self.assertEqual(self.rows(), before)
+
+    def test_endpoint(self):
+        self.place(self.item)
+        self.client.force_login(self.customer)
+        self.assertEqual(self.client.get(reverse('core:chef_analytics')).status_code, 403)
+        self.client.force_login(self.chef)
+        self.assertEqual(self.client.get(reverse('core:chef_analytics'), {'grain': 'week'}).status_code, 400)
+        data = self.client.get(reverse('core:chef_analytics'), {'grain': 'day'}).json()
+        self.assertEqual(data['totals']['orders'], 1)
+        self.assertEqual(len(data['buckets']), 30)  # the last 30 days, today included
@@ -0,0 +1,85 @@
+import os
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from core import assets, checks
+
+
+class MinifyTests(SimpleTestCase):
+    def test_css_drops_comments_and_space_but_keeps_strings(self):
+        css = '/* header */\n.a  >  .b {\n  color: red;\n  content: "a  /* b */  c";\n}\n'
+        self.assertEqual(assets.minify_css(css), '.a>.b{color: red;content: "a  /* b */  c"}')
+
+    def test_js_only_strips_whole_line_comments_and_indentation(self):
+        js = '/* banner */\nfunction f() {\n    // note\n    return "//not a comment";\n}\n\n'
+        self.assertEqual(assets.minify_js(js), 'function f() {\nreturn "//not a comment";\n}')
+
+
+class BundleTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        (self.root / 'src' / 'css').mkdir(parents=True)
+        (self.root / 'src' / 'css' / 'a.css').write_text('.a { color: red; }\n')
+        (self.root / 'src' / 'css' / 'b.css').write_text('/* b */ .b { color: blue; }\n')
+        (self.root / 'project' / 'secret.py').parent.mkdir()
+        (self.root / 'project' / 'secret.py').write_text('SECRET = 1\n')
+        override = override_settings(
+            ASSETS_DIR=self.root / 'src',
+            ASSET_BUILD_DIR=self.root / 'build',
+            ASSET_BUNDLES={'css/site.css': ['css/a.css', 'css/b.css']},
+            STATIC_ROOT=self.root / 'static',
+            STATICFILES_FINDERS=['core.assets.BundleFinder'],
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_bundle_concatenates_minified_sources(self):
+        target = assets.build_bundle('css/site.css')
+        self.assertEqual(target.read_text(), '.a{color: red}\n.b{color: blue}\n')
+
+    def test_bundle_is_rebuilt_only_when_a_source_changes(self):
+        target = assets.build_bundle('css/site.css')
+        built = target.stat().st_mtime
+        os.utime(target, (built + 10, built + 10))
+        target.write_text('stale\n')
+        os.utime(target, (built + 10, built + 10))
+        self.assertEqual(assets.build_bundle('css/site.css').read_text(), 'stale\n')
+        source = self.root / 'src' / 'css' / 'a.css'
+        source.write_text('.a { color: green; }\n')
+        os.utime(source, (built + 20, built + 20))
+        self.assertIn('green', assets.build_bundle('css/site.css').read_text())
+
+    def test_finder_serves_bundles_only(self):
+        finder = assets.BundleFinder()
+        self.assertTrue(finder.find('css/site.css').endswith('site.css'))
+        self.assertEqual(finder.find('css/a.css'), [])
+        self.assertEqual([name for name, _ in finder.list([])], ['css/site.css'])
+
+    def test_finder_check_reports_missing_sources(self):
+        with override_settings(ASSET_BUNDLES={'css/site.css': ['css/missing.css']}):
+            self.assertEqual([e.id for e in assets.BundleFinder().check()], ['core.E001'])
+
+    def test_collectstatic_publishes_hashed_compressed_bundles(self):
+        # Big enough for compression to pay off; WhiteNoise skips files it can't shrink
+        rules = ''.join(f'.card-{n} {{ margin: {n}px; padding: 0 {n}px; }}\n' for n in range(200))
+        (self.root / 'src' / 'css' / 'a.css').write_text(rules)
+        call_command('collectstatic', interactive=False, verbosity=0, stdout=StringIO())
+        names = sorted(p.name for p in (self.root / 'static' / 'css').iterdir())
+        hashed = [name for name in names if name.startswith('site.') and name.endswith('.css')]
+        self.assertEqual(len(hashed), 1)
+        self.assertIn(hashed[0] + '.gz', names)
+        self.assertIn(hashed[0] + '.br', names)
+        self.assertEqual(checks.check_static_root(None), [])
+
+    def test_deploy_check_flags_stray_files(self):
+        (self.root / 'static').mkdir()
+        (self.root / 'static' / 'settings.py').write_text('')
+        self.assertEqual([e.id for e in checks.check_static_root(None)], ['core.E003'])
+        with override_settings(STATICFILES_DIRS=[self.root / 'project', Path(__file__).resolve().parents[2]]):
+            self.assertIn('core.E002', [e.id for e in checks.check_static_root(None)])
@@ -0,0 +1,62 @@
+from django.core.cache import cache
+from django.urls import reverse
+
+from core import chef_pages, jobs, transitions
+from core.models import CustomUser, FoodItem, Job
+
+from .base import PLAIN_STATIC, ShopTestCase, make_item, make_order, make_review
+
+
+@PLAIN_STATIC
+class ChefPageTests(ShopTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def page(self):
+        return self.client.get(reverse('core:chef_detail', args=[self.chef.id])).content.decode()
+
+    def version(self):
+        return CustomUser.objects.get(id=self.chef.id).page_version
+
+    def test_lists_available_dishes_and_reviews(self):
+        make_item(self.chef, 'Sold Out Momo', servings_available=0)
+        make_review(self.item, self.customer, text='Just like home')
+        html = self.page()
+        self.assertIn('Dal Bhat', html)
+        self.assertNotIn('Sold Out Momo', html)
+        self.assertIn('Just like home', html)
+
+    def test_body_is_cached_under_the_page_version(self):
+        self.page()
+        # A queryset update skips the signals, so the cached body stays
+        FoodItem.objects.filter(id=self.item.id).update(name='Renamed')
+        self.assertIn('Dal Bhat', self.page())
+        chef_pages.invalidate(self.chef.id)
+        self.assertIn('Renamed', self.page())
+
+    def test_dish_changes_refresh_the_page(self):
+        self.page()
+        item = FoodItem.objects.get(id=self.item.id)
+        item.name = 'Dal Bhat Tarkari'
+        item.save()
+        self.assertIn('Dal Bhat Tarkari', self.page())
+        make_item(self.chef, 'Sel Roti')
+        self.assertIn('Sel Roti', self.page())
+
+    def test_reviews_and_profile_edits_refresh_the_page(self):
+        before = self.version()
+        make_review(self.item, self.customer)
+        self.assertGreater(self.version(), before)
+        before = self.version()
+        chef = CustomUser.objects.get(id=self.chef.id)
+        chef.speciality = 'Newari feasts'
+        chef.save()
+        self.assertGreater(self.version(), before)
+        self.assertIn('Newari feasts', self.page())
+
+    def test_selling_out_refreshes_the_page(self):
+        self.page()
+        order = make_order(self.chef, self.customer, self.item, quantity=10, status='preparing')
+        transitions.change_status(self.chef, [order.id], 'delivered')
+        jobs.run(Job.objects.get(name='reduce_servings_bulk'))
+        self.assertNotIn('Dal Bhat', self.page())
@@ -0,0 +1,69 @@
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+
+from core import sharding
+from core.models import CustomUser, FoodItem, Review
+
+from .base import PLAIN_STATIC, ShopTestCase, make_chef, make_item, make_review
+
+
+@PLAIN_STATIC
+class ReviewConstraintTests(ShopTestCase):
+    def reviews(self):
+        return Review.objects.using(sharding.shard_for(self.chef.id)).filter(food_item=self.item)
+
+    def post_review(self, rating=5):
+        return self.client.post(
+            reverse('core:food_details', args=[self.item.id]), {'rating': rating, 'review_text': 'Tasty'}, follow=True,
+        )
+
+    def test_database_allows_one_review_per_customer_and_dish(self):
+        make_review(self.item, self.customer)
+        with self.assertRaises(IntegrityError), transaction.atomic(using=sharding.shard_for(self.chef.id)):
+            make_review(self.item, self.customer, rating=1)
+
+    def test_second_review_is_refused_and_not_counted(self):
+        self.client.force_login(self.customer)
+        self.post_review(5)
+        response = self.post_review(1)
+        self.assertIn('You have already reviewed this dish.', [m.message for m in response.context['messages']])
+        self.assertEqual(list(self.reviews().values_list('rating', flat=True)), [5])
+        item = FoodItem.objects.get(id=self.item.id)
+        self.assertEqual((item.rating_count, item.rating_sum), (1, 5))
+
+    def test_chefs_reply_only_to_their_own_dishes(self):
+        review = make_review(self.item, self.customer)
+        other = make_chef('other@example.com')
+        make_item(other, 'Momo')
+        self.client.force_login(other)
+        self.client.post(reverse('core:chef_dashboard'), {'action': 'review_reply', 'review_id': review.id, 'chef_reply': 'Hi'})
+        self.assertEqual(self.reviews().get().chef_reply, '')
+        version = CustomUser.objects.get(id=self.chef.id).page_version
+        self.client.force_login(self.chef)
+        self.client.post(reverse('core:chef_dashboard'), {'action': 'review_reply', 'review_id': review.id, 'chef_reply': 'Thanks!'})
+        self.assertEqual(self.reviews().get().chef_reply, 'Thanks!')
+        self.assertGreater(CustomUser.objects.get(id=self.chef.id).page_version, version)
+
+
+@PLAIN_STATIC
+class SignupConstraintTests(ShopTestCase):
+    def register(self, email):
+        return self.client.post(reverse('core:register'), {
+            'email': email, 'name': 'Sita Sharma', 'password1': 'Kathmandu-2026', 'password2': 'Kathmandu-2026',
+            'userType': 'customer', 'phone': '9800000001', 'address': 'Jhamsikhel, Lalitpur', 'terms': 'on',
+        }, follow=True)
+
+    def test_signup(self):
+        response = self.register('sita@example.com')
+        self.assertRedirects(response, reverse('core:login'))
+        self.assertTrue(CustomUser.objects.filter(email='sita@example.com').exists())
+
+    def test_taken_email_is_refused_whatever_its_case(self):
+        response = self.register('RAM@example.com')
+        self.assertIn('An account with this email already exists.', [m.message for m in response.context['messages']])
+        self.assertEqual(CustomUser.objects.filter(email__iexact='ram@example.com').count(), 1)
+
+    def test_database_refuses_a_duplicate_email(self):
+        # What a concurrent signup that passed validation at the same time runs into
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            CustomUser.objects.create_user(email=self.customer.email, password='x')
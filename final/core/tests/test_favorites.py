@@ -0,0 +1,74 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.urls import reverse
+from django.utils import timezone
+
+from core import favorites
+from core.models import Favorite
+
+from .base import PLAIN_STATIC, ShopTestCase, make_item, make_order
+
+
+class FavoriteTests(ShopTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.momo = make_item(cls.chef, 'Momo')
+
+    def deliver(self, item, quantity=1, days_ago=0):
+        order = make_order(self.chef, self.customer, item, quantity=quantity, status='delivered')
+        # created_at is auto_now_add; move it afterwards (on the order's own shard)
+        order.created_at = timezone.now() - timedelta(days=days_ago)
+        order.save(update_fields=['created_at'])
+        favorites.record_delivery(order)
+        return order
+
+    def test_each_delivery_counts_once(self):
+        order = self.deliver(self.item)
+        favorites.record_delivery(order)  # the job ran twice
+        favorite = Favorite.objects.get()
+        self.assertEqual((favorite.order_count, favorite.last_order_id), (1, order.id))
+        second = self.deliver(self.item)
+        favorite.refresh_from_db()
+        self.assertEqual((favorite.order_count, favorite.last_order_id), (2, second.id))
+
+    def test_recent_and_frequent_dishes_come_first(self):
+        self.deliver(self.item, days_ago=60)
+        self.deliver(self.momo)
+        self.assertEqual([f.food_item_id for f in favorites.top_for(self.customer)], [self.momo.id, self.item.id])
+        self.deliver(self.item)
+        self.deliver(self.item)
+        self.assertEqual([f.food_item_id for f in favorites.top_for(self.customer)], [self.item.id, self.momo.id])
+
+    def test_top_for_attaches_the_last_order(self):
+        order = self.deliver(self.item, quantity=3)
+        self.assertEqual(favorites.top_for(self.customer)[0].last_order.quantity, order.quantity)
+
+    @mock.patch.object(favorites, 'KEEP_PER_CUSTOMER', 2)
+    def test_only_the_best_rows_are_kept(self):
+        dal = self.item
+        self.deliver(dal, days_ago=30)
+        self.deliver(self.momo, days_ago=10)
+        self.deliver(make_item(self.chef, 'Sel Roti'))
+        self.assertEqual(Favorite.objects.count(), 2)
+        self.assertFalse(Favorite.objects.filter(food_item=dal).exists())
+
+    def test_rebuild_matches_the_incremental_rows(self):
+        self.deliver(self.item, quantity=2, days_ago=3)
+        self.deliver(self.momo)
+        self.deliver(self.item)
+        before = list(Favorite.objects.order_by('food_item_id').values_list('food_item_id', 'order_count', 'score', 'last_order_id'))
+        self.assertEqual(favorites.rebuild_all(), 2)
+        after = list(Favorite.objects.order_by('food_item_id').values_list('food_item_id', 'order_count', 'score', 'last_order_id'))
+        self.assertEqual([row[:2] + row[3:] for row in after], [row[:2] + row[3:] for row in before])
+        for (_, _, rebuilt, _), (_, _, incremental, _) in zip(after, before):
+            self.assertAlmostEqual(rebuilt, incremental)
+
+    @PLAIN_STATIC
+    def test_reorder_link_prefills_the_form(self):
+        order = self.deliver(self.item, quantity=3)
+        self.client.force_login(self.customer)
+        response = self.client.get(reverse('core:order'), {'item': self.item.id, 'reorder': order.id})
+        self.assertEqual(response.context['reorder'].id, order.id)
+        self.assertEqual(response.context['order_quantity'], 3)
@@ -0,0 +1,97 @@
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from core import geo
+
+from .base import PLAIN_STATIC, ShopTestCase, make_chef, make_item
+
+THAMEL = (27.7154, 85.3123)
+KATHMANDU = (27.7172, 85.3240)
+BHAKTAPUR = (27.6710, 85.4298)
+POKHARA = (28.2096, 83.9856)
+
+
+def _cell_centre(cell):
+    """Centre of a geohash cell, by bisecting like encode."""
+    lat_lo, lat_hi, lon_lo, lon_hi = -90.0, 90.0, -180.0, 180.0
+    even = True
+    for char in cell:
+        value = geo.BASE32.index(char)
+        for bit in range(4, -1, -1):
+            on = value >> bit & 1
+            if even:
+                mid = (lon_lo + lon_hi) / 2
+                lon_lo, lon_hi = (mid, lon_hi) if on else (lon_lo, mid)
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                lat_lo, lat_hi = (mid, lat_hi) if on else (lat_lo, mid)
+            even = not even
+    return (lat_lo + lat_hi) / 2, (lon_lo + lon_hi) / 2
+
+
+class GeohashTests(SimpleTestCase):
+    def test_encode(self):
+        self.assertEqual(geo.encode(57.64911, 10.40744, 11), 'u4pruydqqvj')
+
+    def test_cells_for_the_delivery_radius_are_precision_5_and_cover_it(self):
+        cells = geo.covering_cells(*KATHMANDU, 10)
+        self.assertTrue(all(len(cell) == 5 for cell in cells))
+        self.assertLessEqual(len(cells), geo.MAX_CELLS)
+        for lat, lon in (THAMEL, (27.79, 85.32), (27.7172, 85.4240), (27.65, 85.26)):
+            self.assertLess(geo.haversine_km(*KATHMANDU, lat, lon), 10)
+            self.assertTrue(any(geo.encode(lat, lon).startswith(cell) for cell in cells), (lat, lon))
+
+    def test_cells_stay_near_the_circle(self):
+        # Every cell touches the circle, so the ranges cover little more than it
+        for cell in geo.covering_cells(*KATHMANDU, 10):
+            height, width = geo.cell_size(len(cell))
+            lat, lon = _cell_centre(cell)
+            self.assertLess(geo.haversine_km(*KATHMANDU, lat, lon), 10 + geo.haversine_km(0, 0, height, width))
+
+    def test_geocode_matches_whole_words_most_specific_part_first(self):
+        self.assertEqual(geo.geocode('Near Thamel Chowk, Thamel, Kathmandu'), THAMEL)
+        self.assertEqual(geo.geocode('Jhamsikhel, Kathmandu'), KATHMANDU)
+        self.assertIsNone(geo.geocode('Thamelkot'))
+        self.assertIsNone(geo.geocode(''))
+
+    def test_geocode_skips_streets_named_after_places(self):
+        self.assertEqual(geo.geocode('Bhaktapur Road, Kathmandu'), KATHMANDU)
+
+    def test_geocode_prefers_the_longest_name(self):
+        self.assertNotEqual(geo.geocode('Old Baneshwor'), geo.geocode('Baneshwor'))
+
+
+class DeliveryAreaTests(ShopTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.near = make_chef('near@example.com', latitude=THAMEL[0], longitude=THAMEL[1], delivery_radius_km=5)
+        cls.small_radius = make_chef('bhaktapur@example.com', latitude=BHAKTAPUR[0], longitude=BHAKTAPUR[1], delivery_radius_km=3)
+        cls.far = make_chef('pokhara@example.com', latitude=POKHARA[0], longitude=POKHARA[1], delivery_radius_km=10)
+
+    def test_chefs_delivering_to(self):
+        ids = set(geo.chefs_delivering_to(*KATHMANDU))
+        # self.chef has no location, so like delivers_to it is treated as delivering anywhere
+        self.assertEqual(ids, {self.near.id, self.chef.id})
+
+    def test_far_chefs_are_not_even_candidates(self):
+        candidates = get_user_model().objects.filter(geo.cells_filter(geo.covering_cells(*KATHMANDU, 10)))
+        self.assertNotIn(self.far.id, set(candidates.values_list('id', flat=True)))
+
+    def test_geohash_follows_the_location(self):
+        self.near.latitude, self.near.longitude = BHAKTAPUR
+        self.near.save(update_fields=['latitude', 'longitude'])
+        self.near.refresh_from_db()
+        self.assertEqual(self.near.geohash, geo.encode(*BHAKTAPUR))
+
+    @PLAIN_STATIC
+    def test_home_page_lists_dishes_that_deliver_to_the_customer(self):
+        near_dish = make_item(self.near, 'Momo')
+        make_item(self.far, 'Fish curry')
+        self.customer.latitude, self.customer.longitude = KATHMANDU
+        self.customer.save()
+        self.client.force_login(self.customer)
+        response = self.client.get(reverse('core:index'))
+        self.assertEqual({item.id for item in response.context['food_items']}, {near_dish.id, self.item.id})
+        self.assertTrue(response.context['near_me'])
@@ -0,0 +1,105 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.db import OperationalError
+from django.utils import timezone
+
+from core import jobs, sharding, transitions
+from core.models import FoodItem, Job, Order
+
+from .base import ShopTestCase, make_order
+
+LOCKED = OperationalError('database is locked')
+
+
+def _fail(**payload):
+    raise ValueError('boom')
+
+
+def _locked_then(func, times):
+    """side_effect raising LOCKED `times` times, then calling func."""
+    calls = []
+
+    def effect(*args, **kwargs):
+        calls.append(None)
+        if len(calls) <= times:
+            raise LOCKED
+        return func(*args, **kwargs)
+    return effect
+
+
+@mock.patch.object(jobs, 'LOCKED_WAIT', 0)
+@mock.patch.dict(jobs.TASKS, {'fail': _fail, 'noop': lambda **payload: None})
+class QueueTests(ShopTestCase):
+    def test_claim_takes_a_job_once(self):
+        job = jobs.enqueue('noop')
+        self.assertEqual([j.id for j in jobs.claim('w1')], [job.id])
+        self.assertEqual(jobs.claim('w2'), [])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), ('running', 'w1'))
+
+    def test_claim_skips_jobs_not_yet_due(self):
+        jobs.enqueue('noop', delay=timedelta(minutes=5))
+        self.assertEqual(jobs.claim('w1'), [])
+
+    def test_failed_job_is_retried_later_then_given_up(self):
+        jobs.enqueue('fail', max_attempts=2)
+        job = jobs.claim('w1')[0]
+        with self.assertLogs('core.jobs', 'WARNING'):
+            self.assertEqual(jobs.run(job), 'queued')
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn('ValueError: boom', job.last_error)
+        Job.objects.filter(id=job.id).update(run_after=timezone.now())
+        with self.assertLogs('core.jobs', 'WARNING'):
+            self.assertEqual(jobs.run(jobs.claim('w1')[0]), 'failed')
+
+    def test_stale_lease_is_requeued(self):
+        job = jobs.enqueue('noop')
+        jobs.claim('w1')
+        self.assertEqual(jobs.requeue_stale(), 0)
+        Job.objects.filter(id=job.id).update(locked_at=timezone.now() - jobs.STALE_AFTER - timedelta(seconds=1))
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual([j.id for j in jobs.claim('w2')], [job.id])
+
+    def test_worker_retries_a_locked_claim(self):
+        jobs.enqueue('noop')
+        with mock.patch.object(jobs, 'claim', side_effect=_locked_then(jobs.claim, times=2)):
+            self.assertEqual(jobs.worker_loop(0, poll_interval=0, burst=True), 1)
+        self.assertEqual(Job.objects.get().status, 'done')
+
+    def test_worker_survives_an_unsaved_outcome(self):
+        jobs.enqueue('noop')
+        jobs.enqueue('noop')
+        with mock.patch.object(Job, 'save', side_effect=LOCKED), self.assertLogs('core.jobs', 'WARNING') as logs:
+            self.assertEqual(jobs.worker_loop(1, poll_interval=0, burst=True), 2)
+        self.assertEqual(len(logs.records), 2)
+        # Nothing recorded: both wait for requeue_stale
+        self.assertEqual(set(Job.objects.values_list('status', flat=True)), {'running'})
+
+
+class ReduceServingsTests(ShopTestCase):
+    def deliver(self, *quantities):
+        orders = [make_order(self.chef, self.customer, self.item, quantity=q, status='preparing') for q in quantities]
+        transitions.change_status(self.chef, [o.id for o in orders], 'delivered')
+        return Job.objects.get(name='reduce_servings_bulk')
+
+    def servings(self):
+        return FoodItem.objects.get(id=self.item.id).servings_available
+
+    def test_delivery_takes_the_servings_off(self):
+        jobs.run(self.deliver(2, 3))
+        self.assertEqual(self.servings(), 5)
+
+    def test_running_the_job_again_takes_nothing_more(self):
+        # A requeued stale lease, or a crash after the UPDATE but before the job was marked done
+        job = self.deliver(2, 3)
+        jobs.run(job)
+        jobs.run(job)
+        self.assertEqual(self.servings(), 5)
+        orders = Order.objects.using(sharding.shard_for(self.chef.id)).filter(food_item=self.item)
+        self.assertEqual(set(orders.values_list('servings_reduced', flat=True)), {True})
+
+    def test_jobs_queued_with_quantities_still_run(self):
+        Job.objects.create(name='reduce_servings_bulk', payload={'quantities': {str(self.item.id): 4}}, run_after=timezone.now())
+        jobs.run(jobs.claim('w1')[0])
+        self.assertEqual(self.servings(), 6)
@@ -0,0 +1,52 @@
+import asyncio
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase
+
+from core.management.commands import loadtest
+
+
+class FakeClient:
+    def __init__(self, status_code=200, text='', error=None):
+        self.response = mock.Mock(status_code=status_code, text=text)
+        self.error = error
+
+    async def request(self, method, url, **kwargs):
+        if self.error:
+            raise self.error
+        return self.response
+
+
+class LoadtestTests(SimpleTestCase):
+    def user(self, client):
+        return loadtest.VirtualUser(client, loadtest.Stats(), 'customer', 'customer0@loadtest.local', [1], think=0)
+
+    def test_percentile(self):
+        values = [0.3, 0.1, 0.2, 0.4]
+        self.assertEqual(loadtest._percentile(values, 50), 0.3)
+        self.assertEqual(loadtest._percentile(values, 99), 0.4)
+        self.assertEqual(loadtest._percentile([], 95), 0.0)
+
+    def test_a_form_posted_back_with_errors_counts_as_an_error(self):
+        # Form views redirect after a successful POST; a 200 is the form again with errors
+        for method, status, ok in [('GET', 200, True), ('POST', 302, True), ('POST', 200, False), ('GET', 500, False)]:
+            user = self.user(FakeClient(status))
+            asyncio.run(user.request('route', method, '/'))
+            self.assertEqual(user.stats.errors['route'], 0 if ok else 1, (method, status))
+            self.assertEqual(len(user.stats.latencies['route']), 1)
+
+    def test_connection_errors_are_recorded(self):
+        user = self.user(FakeClient(error=OSError('refused')))
+        self.assertIsNone(asyncio.run(user.request('route', 'GET', '/')))
+        self.assertEqual(user.stats.errors['route'], 1)
+
+    def test_form_tokens(self):
+        html = '<input name="csrfmiddlewaretoken" value="abc"><input name="idempotency_key" value="tok">'
+        csrf, page = asyncio.run(self.user(FakeClient(text=html)).form('route', '/order/'))
+        self.assertEqual((csrf, loadtest.TOKEN_RE.search(page).group(1)), ('abc', 'tok'))
+
+    def test_needs_httpx(self):
+        with mock.patch('importlib.util.find_spec', return_value=None), self.assertRaisesMessage(CommandError, 'httpx'):
+            call_command('loadtest')
@@ -0,0 +1,72 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.urls import reverse
+from django.utils import timezone
+
+from core import sharding, slots
+from core.models import DeliverySlot, Order
+
+from .base import PLAIN_STATIC, ShopTestCase, make_customer
+
+POKHARA = (28.2096, 83.9856)
+
+
+@PLAIN_STATIC
+class OrderTokenTests(ShopTestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.customer)
+        self.data = {
+            'food_item_id': self.item.id, 'name': 'Ram', 'phone': '9800000000', 'address': 'Baneshwor',
+            'quantity': 1, 'total': '₹150', 'idempotency_key': 'token-1',
+        }
+
+    def orders(self):
+        return Order.objects.using(sharding.shard_for(self.chef.id)).filter(idempotency_key='token-1')
+
+    def test_double_submit_places_one_order(self):
+        first = self.client.post(reverse('core:order'), self.data)
+        second = self.client.post(reverse('core:order'), self.data)
+        self.assertEqual(first.status_code, 302)
+        self.assertEqual(second['Location'], first['Location'])
+        self.assertEqual(self.orders().count(), 1)
+
+    def test_double_submit_without_cached_token_reuses_the_order(self):
+        # Another worker placed it: the order itself is found by its token
+        first = self.client.post(reverse('core:order'), self.data)
+        cache.clear()
+        second = self.client.post(reverse('core:order'), self.data)
+        self.assertEqual(second['Location'], first['Location'])
+        self.assertEqual(self.orders().count(), 1)
+
+    def test_replay_after_the_slot_filled_goes_to_the_order(self):
+        start = timezone.now() + timedelta(hours=3)
+        slot = DeliverySlot.objects.create(chef=self.chef, start=start, end=start + slots.SLOT_LENGTH, capacity=1)
+        first = self.client.post(reverse('core:order'), {**self.data, 'delivery_slot': slot.id})
+        cache.clear()
+        second = self.client.post(reverse('core:order'), {**self.data, 'delivery_slot': slot.id})
+        self.assertEqual(second.status_code, 302)
+        self.assertEqual(second['Location'], first['Location'])
+        slot.refresh_from_db()
+        self.assertEqual(slot.booked, 1)
+
+    def test_replay_after_the_chef_moved_away_goes_to_the_order(self):
+        first = self.client.post(reverse('core:order'), self.data)
+        self.chef.latitude, self.chef.longitude = POKHARA
+        self.chef.delivery_radius_km = 5
+        self.chef.save(update_fields=['latitude', 'longitude', 'delivery_radius_km'])
+        cache.clear()
+        second = self.client.post(reverse('core:order'), self.data)
+        self.assertEqual(second.status_code, 302)
+        self.assertEqual(second['Location'], first['Location'])
+
+    def test_another_customer_cannot_claim_the_token(self):
+        self.client.post(reverse('core:order'), self.data)
+        cache.clear()
+        self.client.force_login(make_customer('sita@example.com'))
+        with self.assertRaises(IntegrityError):
+            # The unique key refuses a second order; it is not handed another customer's order
+            self.client.post(reverse('core:order'), self.data)
+        self.assertEqual(self.orders().get().customer_id, self.customer.id)
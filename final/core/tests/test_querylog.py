@@ -0,0 +1,97 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core import querylog
+from core.models import FoodItem
+
+
+class NormalizeTests(SimpleTestCase):
+    def test_in_lists_and_literals(self):
+        self.assertEqual(
+            querylog.normalize('SELECT * FROM "core_order" WHERE "id" IN (1, 2, 3) AND "name" = \'O\'\'Brien\' LIMIT 21'),
+            'SELECT * FROM "core_order" WHERE "id" IN (...) AND "name" = ? LIMIT ?',
+        )
+
+    def test_placeholders_and_value_rows(self):
+        self.assertEqual(
+            querylog.normalize('INSERT INTO "core_job" ("name", "priority")\n  VALUES (%s, %s), (%s, %s)'),
+            'INSERT INTO "core_job" ("name", "priority") VALUES (...)',
+        )
+
+    def test_in_lists_of_any_length_share_a_fingerprint(self):
+        one = querylog.normalize('SELECT "id" FROM "core_review" WHERE "food_item_id" IN (%s)')
+        many = querylog.normalize('SELECT "id" FROM "core_review" WHERE "food_item_id" IN (%s, %s, %s)')
+        self.assertEqual(querylog.fingerprint(one), querylog.fingerprint(many))
+
+    def test_identifiers_with_digits_are_kept(self):
+        self.assertEqual(querylog.normalize('SELECT "t1"."id" FROM "t1" WHERE "id" = 7'), 'SELECT "t1"."id" FROM "t1" WHERE "id" = ?')
+
+
+class FlushTests(TestCase):
+    def setUp(self):
+        log_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(log_dir.cleanup)
+        self.log_dir = Path(log_dir.name)
+        settings_override = override_settings(QUERY_LOG_DIR=self.log_dir, QUERY_LOG_SLOW_MS=10 ** 6)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        for state in (querylog._queries, querylog._views, querylog._explained):
+            state.clear()
+        token = querylog._view.set('core:index')
+        self.addCleanup(querylog._view.reset, token)
+
+    def records(self):
+        return [json.loads(line) for path in self.log_dir.glob('queries-*.jsonl') for line in path.open()]
+
+    def test_flush_writes_calls_per_view_and_fingerprint(self):
+        with connection.execute_wrapper(querylog._execute):
+            for pk in (1, 2, 3):
+                list(FoodItem.objects.filter(id=pk))
+            list(FoodItem.objects.filter(id__in=[1, 2]))
+        querylog.flush(force=True)
+        calls = {record['sql']: record['calls'] for record in self.records() if record['type'] == 'query'}
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(sorted(calls.values()), [1, 3])
+        self.assertTrue(all(record['view'] == 'core:index' for record in self.records()))
+        # Totals are handed out once
+        querylog.flush(force=True)
+        self.assertEqual(len(self.records()), 2)
+
+    def test_flush_waits_for_the_interval_unless_forced(self):
+        with connection.execute_wrapper(querylog._execute):
+            list(FoodItem.objects.all())
+        with override_settings(QUERY_LOG_FLUSH_SECONDS=3600):
+            querylog.flush()
+        self.assertEqual(self.records(), [])
+
+    def test_slow_query_is_written_with_its_plan(self):
+        with override_settings(QUERY_LOG_SLOW_MS=0), connection.execute_wrapper(querylog._execute):
+            list(FoodItem.objects.filter(id=1))
+            list(FoodItem.objects.filter(id=2))
+        slow = [record for record in self.records() if record['type'] == 'slow']
+        self.assertEqual(len(slow), 2)
+        # The plan of one fingerprint is captured once a minute, and its EXPLAIN isn't logged itself
+        self.assertTrue(slow[0]['explain'])
+        self.assertIsNone(slow[1]['explain'])
+
+    def test_top_queries_adds_up_the_logs(self):
+        with connection.execute_wrapper(querylog._execute):
+            for _ in range(4):
+                list(FoodItem.objects.all())
+        querylog.flush(force=True)
+        out = StringIO()
+        call_command('top_queries', dir=str(self.log_dir), stdout=out)
+        self.assertIn('core:index x4', out.getvalue())
+
+    def test_workers_outside_a_request_are_not_timed(self):
+        querylog._view.set(None)
+        with querylog.worker_connection(connection):
+            list(FoodItem.objects.all())
+        querylog.flush(force=True)
+        self.assertEqual(self.records(), [])
@@ -0,0 +1,100 @@
+import math
+
+from django.urls import reverse
+from django.utils import timezone
+
+from core import ranking, sharding
+from core.models import FoodItem, Order, Review
+
+from .base import PLAIN_STATIC, ShopTestCase, make_customer, make_item, make_order
+
+
+class RankingTests(ShopTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.customers = [make_customer(f'customer{n}@example.com') for n in range(8)]
+
+    def review(self, item, customer, rating):
+        return Review.objects.using(sharding.shard_for(item.chef_id)).create(
+            food_item=item, customer=customer, rating=rating, text='Tasty',
+        )
+
+    def scores(self, *items):
+        return [FoodItem.objects.get(id=item.id).rating_score for item in items]
+
+    def test_one_five_star_review_does_not_beat_many_good_ones(self):
+        lucky = make_item(self.chef, 'Sel Roti')
+        self.review(lucky, self.customers[0], 5)
+        for customer in self.customers:
+            self.review(self.item, customer, 5 if customer.id % 2 else 4)
+        lucky_score, steady_score = self.scores(lucky, self.item)
+        self.assertGreater(steady_score, lucky_score)
+        self.assertAlmostEqual(lucky_score, (ranking.PRIOR_WEIGHT * ranking.PRIOR_RATING + 5) / (ranking.PRIOR_WEIGHT + 1))
+
+    def test_edited_and_deleted_reviews_are_recounted(self):
+        first = self.review(self.item, self.customers[0], 5)
+        second = self.review(self.item, self.customers[1], 3)
+        first.rating = 1
+        first.save()
+        second.delete()
+        item = FoodItem.objects.get(id=self.item.id)
+        self.assertEqual((item.rating_count, item.rating_sum), (1, 1))
+        self.chef.refresh_from_db()
+        self.assertEqual((self.chef.rating_count, self.chef.rating_sum), (1, 1))
+
+    def test_deleting_a_dish_takes_its_reviews_off_the_chef(self):
+        other = make_item(self.chef, 'Momo')
+        self.review(self.item, self.customers[0], 5)
+        self.review(other, self.customers[0], 2)
+        other.delete()
+        self.chef.refresh_from_db()
+        self.assertEqual((self.chef.rating_count, self.chef.rating_sum), (1, 5))
+
+    def test_order_weight_halves_every_half_life(self):
+        now = timezone.now()
+        older = ranking.order_weight(1, now - ranking.TRENDING_HALF_LIFE)
+        self.assertAlmostEqual(ranking.order_weight(1, now) - older, math.log(2))
+        self.assertAlmostEqual(ranking.order_weight(3, now) - ranking.order_weight(1, now), math.log(3))
+
+    def test_recent_orders_trend_above_older_ones(self):
+        fresh = make_item(self.chef, 'Momo')
+        make_order(self.chef, self.customer, fresh)
+        stale = make_order(self.chef, self.customer, self.item, quantity=3)
+        Order.objects.using(stale._state.db).filter(id=stale.id).update(
+            created_at=timezone.now() - 2 * ranking.TRENDING_HALF_LIFE,
+        )
+        ranking.recompute_all()
+        fresh.refresh_from_db()
+        self.item.refresh_from_db()
+        # 3 servings at a quarter of the weight
+        self.assertAlmostEqual(self.item.trending_score - fresh.trending_score, math.log(3 / 4), places=3)
+        self.assertGreater(fresh.trending_score, self.item.trending_score)
+
+    def test_incremental_scores_match_a_rebuild(self):
+        other = make_item(self.chef, 'Momo')
+        for n, customer in enumerate(self.customers[:5]):
+            self.review(self.item if n % 2 else other, customer, n + 1)
+            with self.captureOnCommitCallbacks(execute=True):
+                make_order(self.chef, customer, other, quantity=n + 1)
+        fields = ('rating_count', 'rating_sum', 'rating_score', 'trending_score')
+        incremental = list(FoodItem.objects.order_by('id').values_list(*fields))
+        ranking.recompute_all()
+        rebuilt = list(FoodItem.objects.order_by('id').values_list(*fields))
+        for a, b in zip(incremental, rebuilt):
+            self.assertEqual(a[:2], b[:2])
+            self.assertAlmostEqual(a[2], b[2])
+            self.assertAlmostEqual(a[3], b[3], places=6)
+
+    @PLAIN_STATIC
+    def test_home_page_sorts(self):
+        top = make_item(self.chef, 'Momo')
+        self.review(top, self.customers[0], 5)
+        with self.captureOnCommitCallbacks(execute=True):
+            make_order(self.chef, self.customer, self.item)
+        new = make_item(self.chef, 'Sel Roti')
+        names = {}
+        for sort in ('top', 'trending', 'new'):
+            response = self.client.get(reverse('core:index'), {'sort': sort})
+            names[sort] = [item.id for item in response.context['food_items']][0]
+        self.assertEqual(names, {'top': top.id, 'trending': self.item.id, 'new': new.id})
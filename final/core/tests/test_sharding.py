@@ -0,0 +1,116 @@
+from datetime import timedelta
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core import sharding
+from core.models import FoodItem, Order, Review
+
+from .base import ShopTestCase, make_chef, make_customer, make_order, make_review
+
+SHARDED = skipUnless(len(settings.SHARDS) >= 2, 'needs DJANGO_SHARDS=2 or more')
+
+
+class HashRingTests(SimpleTestCase):
+    def test_keys_spread_over_every_node(self):
+        ring = sharding.HashRing(['a', 'b', 'c'])
+        counts = {node: 0 for node in 'abc'}
+        for key in range(3000):
+            counts[ring.node_for(key)] += 1
+        self.assertTrue(all(700 < n < 1300 for n in counts.values()), counts)
+
+    def test_a_new_node_only_takes_keys(self):
+        before = sharding.HashRing(['a', 'b', 'c'])
+        after = sharding.HashRing(['a', 'b', 'c', 'd'])
+        moved = [key for key in range(3000) if before.node_for(key) != after.node_for(key)]
+        self.assertEqual({after.node_for(key) for key in moved}, {'d'})
+        self.assertLess(len(moved), 3000 / 4 * 1.3)
+
+    def test_shard_for(self):
+        with override_settings(SHARDS=[]):
+            self.assertEqual(sharding.shard_for(7), 'default')
+        with override_settings(SHARDS=['shard_0', 'shard_1']):
+            self.assertEqual({sharding.shard_for(chef_id) for chef_id in range(50)}, {'shard_0', 'shard_1'})
+            self.assertEqual(sharding.shard_for(None), sharding.shard_for(0))
+
+
+class GatherTests(SimpleTestCase):
+    def test_merges_shards_in_order_and_applies_the_limit(self):
+        rows = {
+            'shard_0': [{'id': 1, 'created_at': 9}, {'id': 2, 'created_at': 5}, {'id': 3, 'created_at': 1}],
+            'shard_1': [{'id': 4, 'created_at': 8}, {'id': 5, 'created_at': 7}, {'id': 6, 'created_at': 2}],
+        }
+        queried = []
+
+        def fetch(queryset, alias):
+            queried.append((alias, queryset.query.order_by, queryset.query.high_mark))
+            return rows[alias]
+
+        with override_settings(SHARDS=['shard_0', 'shard_1']), mock.patch.object(sharding, '_fetch', fetch):
+            merged = sharding.gather(Order.objects.values('id', 'created_at'), order_by=('-created_at',), limit=4)
+        self.assertEqual([row['id'] for row in merged], [1, 4, 5, 2])
+        # Each shard is asked for its own first `limit` rows in the same order
+        self.assertEqual(sorted(queried), [('shard_0', ('-created_at',), 4), ('shard_1', ('-created_at',), 4)])
+
+
+@SHARDED
+class ShardedGatherTests(TransactionTestCase):
+    # Not TestCase: gather reads on worker threads, which can't see another connection's open transaction
+    databases = '__all__'
+
+    def test_gather_across_real_shards(self):
+        customer = make_customer()
+        chefs = {}
+        for n in range(50):
+            chef = make_chef(f'chef{n}@example.com')
+            chefs.setdefault(sharding.shard_for(chef.id), chef)
+            if len(chefs) == 2:
+                break
+        now = timezone.now()
+        expected = []
+        for n, chef in enumerate(list(chefs.values()) * 3):
+            order = make_order(chef, customer)
+            Order.objects.using(order._state.db).filter(id=order.id).update(created_at=now - timedelta(minutes=n))
+            expected.append(order.id)
+        merged = sharding.gather(Order.objects.filter(customer=customer), order_by=('-created_at',), limit=4)
+        self.assertEqual([order.id for order in merged], expected[:4])
+        self.assertEqual({order._state.db for order in merged}, set(chefs))
+
+
+@SHARDED
+class ShardTests(ShopTestCase):
+    def other_shard(self):
+        return next(alias for alias in settings.SHARDS if alias != sharding.shard_for(self.chef.id))
+
+    def test_each_shard_numbers_its_own_rows(self):
+        order = make_order(self.chef, self.customer)
+        start = (settings.SHARDS.index(order._state.db) + 1) * sharding.ID_BLOCK
+        self.assertTrue(start <= order.id < start + sharding.ID_BLOCK)
+
+    def test_related_rows_are_read_from_the_chefs_shard(self):
+        order = make_order(self.chef, self.customer, self.item)
+        make_review(self.item, self.customer)
+        self.assertEqual(list(self.chef.orders_received.values_list('id', flat=True)), [order.id])
+        self.assertEqual(self.item.reviews.count(), 1)
+
+    def test_deleting_a_dish_reaches_its_shard_rows(self):
+        order = make_order(self.chef, self.customer, self.item)
+        make_review(self.item, self.customer)
+        FoodItem.objects.get(id=self.item.id).delete()
+        shard = sharding.shard_for(self.chef.id)
+        self.assertIsNone(Order.objects.using(shard).get(id=order.id).food_item_id)
+        self.assertFalse(Review.objects.using(shard).exists())
+
+    def test_misplaced_rows_move_with_their_ids(self):
+        wrong = self.other_shard()
+        order = Order.objects.using(wrong).create(
+            chef=self.chef, customer=self.customer, food_item=self.item, name='Ram', phone='9800000000',
+            address='Baneshwor', total='₹100',
+        )
+        right = sharding.shard_for(self.chef.id)
+        self.assertEqual(sharding.misplaced(self.chef.id), [(self.chef.id, wrong, right)])
+        self.assertEqual(sharding.move_chef(self.chef.id, wrong, right), (1, 0))
+        self.assertEqual(sharding.misplaced(self.chef.id), [])
+        self.assertTrue(Order.objects.using(right).filter(id=order.id).exists())
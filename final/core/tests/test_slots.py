@@ -0,0 +1,75 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.urls import reverse
+from django.utils import timezone
+
+from core import ranking, sharding, slots, transitions
+from core.models import DeliverySlot, FoodItem, Order, SalesRollup
+
+from .base import PLAIN_STATIC, ShopTestCase
+
+
+class DeliverySlotTests(ShopTestCase):
+    def setUp(self):
+        cache.clear()  # order tokens
+        start = timezone.now() + timedelta(hours=3)
+        self.slot = DeliverySlot.objects.create(chef=self.chef, start=start, end=start + slots.SLOT_LENGTH, capacity=2)
+
+    def test_claim_stops_at_capacity(self):
+        slots.claim(self.chef, self.slot.id)
+        slots.claim(self.chef, self.slot.id)
+        with self.assertRaises(slots.SlotFull):
+            slots.claim(self.chef, self.slot.id)
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.booked, 2)
+
+    def test_slots_close_before_they_start(self):
+        DeliverySlot.objects.filter(id=self.slot.id).update(start=timezone.now() + slots.LEAD_TIME / 2)
+        with self.assertRaises(slots.SlotFull):
+            slots.claim(self.chef, self.slot.id)
+
+    @PLAIN_STATIC
+    def test_cancelling_gives_the_place_back(self):
+        slots.claim(self.chef, self.slot.id)  # someone else's booking
+        order = self.place_order()
+        transitions.change_status(self.chef, [order.id], 'cancelled')
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.booked, 1)
+
+    def place_order(self, key='token-1'):
+        self.client.force_login(self.customer)
+        self.client.post(reverse('core:order'), {
+            'food_item_id': self.item.id, 'name': 'Ram', 'phone': '9800000000', 'address': 'Baneshwor',
+            'quantity': 1, 'total': '₹150', 'delivery_slot': self.slot.id, 'idempotency_key': key,
+        })
+        return Order.objects.using(sharding.shard_for(self.chef.id)).filter(idempotency_key=key).first()
+
+    @PLAIN_STATIC
+    def test_order_for_a_full_slot_is_refused(self):
+        DeliverySlot.objects.filter(id=self.slot.id).update(booked=2)
+        self.assertIsNone(self.place_order())
+
+    @PLAIN_STATIC
+    def test_order_is_counted_after_it_commits(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            order = self.place_order()
+        self.assertEqual(order.delivery_slot_id, self.slot.id)
+        # Nothing counted inside the order's transaction
+        self.assertEqual(FoodItem.objects.get(id=self.item.id).trending_score, 0)
+        self.assertFalse(SalesRollup.objects.exists())
+        for callback in callbacks:
+            callback()
+        self.assertGreater(FoodItem.objects.get(id=self.item.id).trending_score, 0)
+        self.assertEqual(SalesRollup.objects.filter(grain='day').get().orders, 1)
+
+    @PLAIN_STATIC
+    def test_a_failed_count_does_not_fail_the_order(self):
+        with mock.patch.object(ranking, 'record_order', side_effect=DatabaseError('locked')), \
+                self.assertLogs('core.signals', 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+            order = self.place_order()
+        self.assertIsNotNone(order)
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.booked, 1)
@@ -0,0 +1,73 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.template.base import Template
+from django.template.loader_tags import BlockNode
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+
+from core import profiling
+from core.models import CustomUser, FoodItem
+from core.templatetags.core_tags import STAR_ROWS, star_row
+
+from .base import PLAIN_STATIC, ShopTestCase
+
+
+class StarRowTests(SimpleTestCase):
+    def test_rounds_down_and_clamps(self):
+        self.assertEqual(star_row(3.9), STAR_ROWS[3])
+        self.assertEqual(star_row(7), STAR_ROWS[5])
+        self.assertEqual(star_row(-1), STAR_ROWS[0])
+        self.assertEqual(star_row('n/a'), STAR_ROWS[0])
+        self.assertEqual(STAR_ROWS[2].count('bi-star-fill'), 2)
+
+
+@PLAIN_STATIC
+class DishCardCacheTests(ShopTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def home(self):
+        return self.client.get(reverse('core:index')).content.decode()
+
+    def test_card_is_reused_until_the_dish_changes(self):
+        self.assertIn('Dal Bhat', self.home())
+        # A queryset update skips save(), so the version and the cached card stay as they were
+        FoodItem.objects.filter(id=self.item.id).update(name='Dal Bhat Tarkari')
+        self.assertNotIn('Dal Bhat Tarkari', self.home())
+        item = FoodItem.objects.get(id=self.item.id)
+        item.price = 180
+        item.save()
+        self.assertIn('Dal Bhat Tarkari', self.home())
+
+    def test_renaming_the_chef_refreshes_the_card(self):
+        self.assertIn('Asha', self.home())
+        chef = CustomUser.objects.get(id=self.chef.id)
+        chef.first_name = 'Sita'
+        chef.save()
+        page = self.home()
+        self.assertIn('Sita', page)
+        self.assertNotIn('Asha', page)
+
+
+class TemplateProfilingTests(ShopTestCase):
+    def tearDown(self):
+        # enable() patches Django's classes for the whole process; undo it for the other tests
+        if profiling.is_enabled():
+            Template._render = Template._render.__wrapped__
+            BlockNode.render = BlockNode.render.__wrapped__
+            profiling._enabled = False
+        profiling.reset()
+
+    @override_settings(TEMPLATE_PROFILING=True)
+    @PLAIN_STATIC
+    def test_server_timing_lists_templates_and_blocks(self):
+        from django.shortcuts import render
+
+        middleware = profiling.TemplateProfilingMiddleware(lambda request: render(request, 'core/index.html', {}))
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        response = middleware(request)
+        header = response['Server-Timing']
+        self.assertIn('template:core/index.html x1', header)
+        self.assertIn('block:core/index.html:content', header)
+        self.assertTrue(any(key.startswith('template:') for key, *_ in profiling.snapshot()))
@@ -0,0 +1,60 @@
+from django.urls import reverse
+
+from core import transitions
+from core.models import Job
+
+from .base import PLAIN_STATIC, ShopTestCase, make_chef, make_order
+
+
+class StatusTransitionTests(ShopTestCase):
+    def test_illegal_transition_leaves_the_order_alone(self):
+        order = make_order(self.chef, self.customer, status='cancelled')
+        self.assertEqual(transitions.change_status(self.chef, [order.id], 'delivered'), [])
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'cancelled')
+
+    def test_status_nothing_moves_to_is_rejected(self):
+        order = make_order(self.chef, self.customer)
+        with self.assertRaises(ValueError):
+            transitions.change_status(self.chef, [order.id], 'pending')
+
+    def test_allowed_transition(self):
+        order = make_order(self.chef, self.customer)
+        changed = transitions.change_status(self.chef, [order.id], 'confirmed')
+        self.assertEqual([o.id for o in changed], [order.id])
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'confirmed')
+
+    def test_same_status_is_done_without_side_effects(self):
+        order = make_order(self.chef, self.customer, self.item, status='preparing')
+        transitions.change_status(self.chef, [order.id], 'delivered')
+        again = transitions.change_status(self.chef, [order.id], 'delivered')
+        self.assertEqual([o.id for o in again], [order.id])
+        self.assertEqual(Job.objects.filter(name='reduce_servings_bulk').count(), 1)
+
+    def test_other_chefs_orders_are_not_reported(self):
+        order = make_order(self.chef, self.customer, status='confirmed')
+        self.assertEqual(transitions.change_status(make_chef('other@example.com'), [order.id], 'confirmed'), [])
+
+
+class StatusViewTests(ShopTestCase):
+    def setUp(self):
+        self.client.force_login(self.chef)
+
+    def test_retried_bulk_request_gets_the_same_answer(self):
+        orders = [make_order(self.chef, self.customer) for _ in range(2)]
+        cancelled = make_order(self.chef, self.customer, status='cancelled')
+        data = {'status': 'confirmed', 'order_ids': [o.id for o in orders] + [cancelled.id]}
+        first = self.client.post(reverse('core:chef_order_status'), data).json()
+        second = self.client.post(reverse('core:chef_order_status'), data).json()
+        self.assertEqual(second, first)
+        self.assertEqual(sorted(o['id'] for o in second['changed']), sorted(o.id for o in orders))
+        self.assertEqual(second['unchanged'], [cancelled.id])
+
+    @PLAIN_STATIC
+    def test_dashboard_form_with_the_current_status_succeeds(self):
+        order = make_order(self.chef, self.customer, status='confirmed')
+        response = self.client.post(
+            reverse('core:chef_dashboard'), {'action': 'order_status', 'order_id': order.id, 'status': 'confirmed'}, follow=True,
+        )
+        self.assertEqual([m.message for m in response.context['messages']], ['Order status updated.'])
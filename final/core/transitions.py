@@ -0,0 +1,80 @@
+"""
+Order status changes made by chefs, one order or many at a time.
+
+Order.TRANSITIONS lists the allowed moves. `change_status` applies one move to
+a batch of the chef's orders with a single UPDATE ... WHERE chef = ... AND
+status IN (statuses allowed to move there), so orders in any other state
+(including ones another request just changed) are left alone. Orders already
+in the new status count as done without being touched, so a retried request
+gets the same answer as the first. The side effects of the orders that did
+change are batched too:
+
+- delivered: one reduce_servings_bulk job (servings summed per dish when it
+  runs) and one record_favorites job
+- delivered/cancelled: analytics counts, one update per dish and hour
+- cancelled: places given back to their delivery slots in one UPDATE
+
+If the UPDATE changes fewer orders than were read (another request got to one
+first where the database can't lock rows, e.g. SQLite), nothing is applied and
+`OrdersChanged` is raised; the caller can reload and retry.
+"""
+from django.db import transaction
+
+from . import analytics, jobs, sharding, slots
+from .models import Order
+
+MAX_BATCH = 200
+
+
+class OrdersChanged(Exception):
+    """Some of the orders changed status while this batch was being applied; nothing was changed."""
+
+
+def change_status(chef, order_ids, new_status):
+    """
+    Move the chef's orders in `order_ids` to `new_status` where allowed.
+
+    Returns the orders now in `new_status`: the ones moved, then any that already were (left as they are).
+    """
+    sources = Order.statuses_before(new_status)
+    if not sources:
+        raise ValueError(f'Orders cannot be moved to {new_status!r}.')
+    order_ids = list(order_ids)[:MAX_BATCH]
+    shard = sharding.shard_for(chef.id)
+    # Orders are on the chef's shard, the rollups, slots and jobs written after them in default. With shards
+    # the shard's transaction commits first: if default's commit then fails, the orders keep their new status
+    # without those updates (see the order view).
+    with transaction.atomic(), transaction.atomic(using=shard):
+        orders = Order.objects.using(shard).filter(chef=chef, id__in=order_ids).only(
+            'id', 'status', 'chef_id', 'customer_id', 'food_item_id', 'quantity', 'created_at', 'delivery_slot_id',
+        )
+        changes = [(order, order.status) for order in orders.select_for_update().filter(status__in=sources)]
+        already = list(orders.filter(status=new_status))
+        if not changes:
+            return already
+        updated = (
+            Order.objects.using(shard)
+            .filter(id__in=[order.id for order, _ in changes], status__in=sources)
+            .update(status=new_status)
+        )
+        if updated != len(changes):
+            # Side effects would be counted for orders that didn't move; raising rolls back both transactions
+            raise OrdersChanged(f'{len(changes) - updated} of the orders changed meanwhile.')
+        for order, _ in changes:
+            order.status = new_status
+        _after_change(changes, new_status)
+    return [order for order, _ in changes] + already
+
+
+def _after_change(changes, new_status):
+    analytics.record_status_changes(changes)
+    if new_status == 'cancelled':
+        slots.release([order.delivery_slot_id for order, _ in changes])
+    if new_status != 'delivered':
+        return
+    with_dishes = [order.id for order, _ in changes if order.food_item_id]
+    if with_dishes:
+        jobs.enqueue('reduce_servings_bulk', priority=10, order_ids=with_dishes)
+    delivered_to_customers = [order.id for order, _ in changes if order.customer_id and order.food_item_id]
+    if delivered_to_customers:
+        jobs.enqueue('record_favorites', order_ids=delivered_to_customers)
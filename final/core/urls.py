@@ -13,6 +13,9 @@ urlpatterns = [
     path('register/', views.register_view, name='register'),
     path('contact/', views.contact, name='contact'),
     path('chefs/', views.chef_profile, name='chef_profile'),
+    path('chefs/<int:chef_id>/', views.chef_detail, name='chef_detail'),
     path('food/<int:item_id>/', views.food_details, name='food_details'),
     path('chef-dashboard/', views.chef_dashboard, name='chef_dashboard'),
+    path('chef-dashboard/orders/status/', views.chef_order_status, name='chef_order_status'),
+    path('chef-dashboard/analytics/', views.chef_analytics, name='chef_analytics'),
 ]
@@ -1,6 +1,9 @@
 import re
+import uuid
+from datetime import datetime, time, timedelta
 from decimal import Decimal
 from urllib.parse import urlencode
+from django.http import Http404, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
 from django.contrib.auth import login as auth_login, logout as auth_logout, authenticate
@@ -8,39 +11,70 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
+from django.conf import settings
+from django.core.cache import cache
 from django.contrib import messages
-from django.db.models import Count, Avg, Q
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Exists, OuterRef, Subquery, IntegerField
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.http import require_POST
 from .models import Order, FoodItem, Review
+from . import analytics, chef_pages, favorites, geo, jobs, ranking, sharding, slots, tasks, transitions
 
 User = get_user_model()
 EMAIL_REGEX = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
 
 
-def _parse_total(s):
-    """Parse '₹180' or '180' to Decimal."""
-    if not s:
-        return Decimal('0')
-    s = re.sub(r'[^\d.]', '', str(s))
-    try:
-        return Decimal(s)
-    except Exception:
-        return Decimal('0')
+SLOT_DAYS = 7  # days of delivery slots opened at once from the chef dashboard
+ORDER_TOKEN_TTL = 15 * 60  # seconds a placed order's token is remembered in the cache
+
+
+def _order_token_cache_key(token):
+    return f'order-token:{token}'
+
+
+def _nearby_chef_ids(request):
+    """Ids of chefs delivering to the logged-in user's location, or None when we don't know where they are."""
+    if not request.user.is_authenticated:
+        return None
+    location = geo.user_location(request.user)
+    if location is None:
+        return None
+    return geo.chefs_delivering_to(*location)
+
+
+def _customer_favorites(user):
+    if _user_role(user) != 'customer':
+        return []
+    return favorites.top_for(user)
 
 
 def index(request):
-    from django.db.models import Avg
     # Only show food items that still have servings available (not sold out / delivered)
-    food_items = (
-        FoodItem.objects.filter(servings_available__gt=0)
-        .select_related('chef')
-        .annotate(
-            review_count=Count('reviews'),
-            avg_rating=Avg('reviews__rating'),
-        )
-    )[:24]
-    return render(request, 'core/index.html', {'food_items': food_items})
+    sort = ranking.resolve_sort(request.GET.get('sort'))
+    food_items = FoodItem.objects.filter(servings_available__gt=0)
+    nearby_chef_ids = _nearby_chef_ids(request)
+    if nearby_chef_ids is not None:
+        food_items = food_items.filter(chef_id__in=nearby_chef_ids)
+    food_items = food_items.select_related('chef').order_by(*ranking.SORT_ORDERINGS[sort])[:24]
+    return render(request, 'core/index.html', {
+        'food_items': food_items,
+        'favorites': _customer_favorites(request.user),
+        'sort': sort,
+        'near_me': nearby_chef_ids is not None,
+    })
+
+
+def _chef_item_ids(chef):
+    # Reviews can't join to the chef's dishes when they live on a shard, so filter by dish id
+    return list(FoodItem.objects.filter(chef=chef).values_list('id', flat=True))
+
+
+def _delivery_slots(food_item):
+    """Bookable slots of the dish's chef, with remaining places straight from the slot rows."""
+    return list(slots.bookable(food_item.chef_id)) if food_item else []
 
 
 def order(request):
@@ -53,6 +87,16 @@ def order(request):
             login_url += '?' + urlencode({'next': next_url})
         return redirect(login_url)
 
+    # Each rendered form carries a one-time token; a replayed POST (double tap, browser retry) with a token
+    # we have already seen goes straight back to that order's confirmation without creating another one
+    order_token = request.POST.get('idempotency_key', '')[:64] if request.method == 'POST' else ''
+    if order_token:
+        placed_id = cache.get(_order_token_cache_key(order_token))
+        if placed_id:
+            return redirect('core:order_confirmation', order_id=placed_id)
+    token_posted = bool(order_token)
+    order_token = order_token or uuid.uuid4().hex
+
     food_item = None
     item_id = request.GET.get('item') or (request.POST.get('food_item_id') if request.method == 'POST' else None)
     if item_id:
@@ -62,6 +106,17 @@ def order(request):
             food_item = None
 
     if request.method == 'POST':
+        # A replay the cache missed (placed by another process, or evicted) still goes to its order, before the
+        # checks below: the slot may have filled or the chef's radius shrunk since it was placed
+        if token_posted:
+            placed_id = (
+                Order.objects.using(sharding.shard_for(food_item.chef_id if food_item else None))
+                .filter(idempotency_key=order_token, customer=request.user).values_list('id', flat=True).first()
+            )
+            if placed_id:
+                cache.set(_order_token_cache_key(order_token), placed_id, ORDER_TOKEN_TTL)
+                return redirect('core:order_confirmation', order_id=placed_id)
+
         # Chef cannot order their own food
         if food_item and getattr(request.user, 'user_type', None) == 'chef' and food_item.chef_id == request.user.id:
             messages.error(request, 'You cannot order your own food. Please order from other chefs.')
@@ -73,6 +128,8 @@ def order(request):
                 'order_name': order_name,
                 'order_phone': order_phone,
                 'order_address': order_address,
+                'idempotency_key': order_token,
+                'delivery_slots': _delivery_slots(food_item),
             })
 
         name = request.POST.get('name', '').strip()
@@ -99,8 +156,39 @@ def order(request):
                 'order_name': order_name,
                 'order_phone': order_phone,
                 'order_address': order_address,
+                'idempotency_key': order_token,
+                'delivery_slots': _delivery_slots(food_item),
             })
-        if delivery_time:
+        # Chef must deliver to this address (geocoded from the order, else the customer's saved location)
+        drop = geo.geocode(address) or geo.user_location(request.user)
+        if food_item and drop and not geo.delivers_to(food_item.chef, *drop):
+            messages.error(request, 'Sorry, this chef does not deliver to your address. Please choose a chef near you.')
+            return render(request, 'core/order.html', {
+                'food_item': food_item,
+                'order_name': name,
+                'order_phone': phone,
+                'order_address': address,
+                'idempotency_key': order_token,
+                'delivery_slots': _delivery_slots(food_item),
+            })
+        # Chefs with delivery slots take bookings only for a slot; others get a free-text preferred time
+        slot = None
+        open_slots = _delivery_slots(food_item)
+        if open_slots:
+            slot_id = request.POST.get('delivery_slot', '')
+            slot = next((s for s in open_slots if str(s.id) == slot_id and s.remaining), None)
+            if slot is None:
+                messages.error(request, 'Please choose a delivery slot that still has space.')
+                return render(request, 'core/order.html', {
+                    'food_item': food_item,
+                    'order_name': name,
+                    'order_phone': phone,
+                    'order_address': address,
+                    'idempotency_key': order_token,
+                    'delivery_slots': open_slots,
+                })
+            delivery_time = slot.label
+        elif delivery_time:
             delivery_time = delivery_time + ' (preferred)'
         else:
             delivery_time = 'Will be confirmed'
@@ -112,24 +200,75 @@ def order(request):
         if not food_item:
             dish_key = request.POST.get('dish', 'thali')
 
-        Order.objects.create(
-            chef=chef,
-            customer=customer,
-            food_item=food_item,
-            name=name,
-            phone=phone,
-            address=address,
-            dish=dish_key,
-            quantity=quantity,
-            total=total,
-            delivery_time=delivery_time,
-            notes=notes,
-            status='pending' if chef else 'confirmed',
-        )
-        order_obj = Order.objects.latest('created_at')
+        # The order goes to the chef's shard; the job and slot rows are in default (core.sharding)
+        shard = sharding.shard_for(chef.id if chef else None)
+        try:
+            # With shards these are two transactions, not one: the order's (on its shard) commits first, then
+            # default's (notify job, slot claim). If default's commit fails after that, the order stands without
+            # them and a resubmit finds it by its token. Without shards both are 'default', i.e. one transaction.
+            # Ranking and sales totals are counted once default has committed (core.signals).
+            with transaction.atomic(), transaction.atomic(using=shard):
+                order_obj = Order.objects.using(shard).create(
+                    chef=chef,
+                    customer=customer,
+                    food_item=food_item,
+                    name=name,
+                    phone=phone,
+                    address=address,
+                    dish=dish_key,
+                    quantity=quantity,
+                    total=total,
+                    delivery_time=delivery_time,
+                    notes=notes,
+                    status='pending' if chef else 'confirmed',
+                    idempotency_key=order_token,
+                    delivery_slot=slot,
+                )
+                if chef:
+                    jobs.enqueue('notify_chef_new_order', order_id=order_obj.id)
+                if slot:
+                    # Last statement before commit, so the slot row is locked as briefly as possible
+                    slots.claim(chef, slot.id)
+        except IntegrityError:
+            # Same token placed by another worker between the lookup above and this insert: reuse that order
+            order_obj = Order.objects.using(shard).filter(idempotency_key=order_token, customer=customer).first()
+            if order_obj is None:
+                raise
+        except slots.SlotFull:
+            messages.error(request, f'Sorry, the {slot.label} slot just filled up. Please pick another one.')
+            return render(request, 'core/order.html', {
+                'food_item': food_item,
+                'order_name': name,
+                'order_phone': phone,
+                'order_address': address,
+                'idempotency_key': order_token,
+                'delivery_slots': _delivery_slots(food_item),
+            })
+        cache.set(_order_token_cache_key(order_token), order_obj.id, ORDER_TOKEN_TTL)
         request.session['last_order_id'] = order_obj.id
         return redirect('core:order_confirmation', order_id=order_obj.id)
 
+    # Reorder (?reorder=<order id>): pre-fill everything from that earlier order of the same dish
+    previous = None
+    reorder_id = request.GET.get('reorder', '')
+    if food_item and reorder_id.isdigit():
+        previous = (
+            Order.objects.using(sharding.shard_for(food_item.chef_id))
+            .filter(id=int(reorder_id), customer=request.user, food_item=food_item).first()
+        )
+    if previous:
+        return render(request, 'core/order.html', {
+            'food_item': food_item,
+            'order_name': previous.name,
+            'order_phone': previous.phone,
+            'order_address': previous.address,
+            'order_quantity': previous.quantity,
+            'order_notes': previous.notes,
+            'reorder': previous,
+            'idempotency_key': order_token,
+            'delivery_slots': _delivery_slots(food_item),
+        })
+
     # Pre-fill name, phone, address from logged-in user's profile (registration data)
     order_name = ''
     order_phone = ''
@@ -145,11 +284,15 @@ def order(request):
         'order_name': order_name,
         'order_phone': order_phone,
         'order_address': order_address,
+        'idempotency_key': order_token,
+        'delivery_slots': _delivery_slots(food_item),
     })
 
 
 def order_confirmation(request, order_id):
-    order_obj = get_object_or_404(Order, id=order_id)
+    order_obj = sharding.find(Order.objects.filter(id=order_id))
+    if order_obj is None:
+        raise Http404('No order found.')
     return render(request, 'core/order_confirmation.html', {'order': order_obj})
 
 
@@ -165,8 +308,15 @@ def customer_dashboard(request):
     if _user_role(request.user) != 'customer':
         messages.warning(request, 'Only customers can access My Orders.')
         return redirect('core:index')
-    orders = Order.objects.filter(customer=request.user).select_related('chef', 'food_item')
-    return render(request, 'core/customer_dashboard.html', {'orders': orders})
+    # A customer's orders are spread over their chefs' shards
+    orders = sharding.gather(
+        Order.objects.filter(customer=request.user).prefetch_related('chef', 'food_item'),
+        order_by=['-created_at'],
+    )
+    return render(request, 'core/customer_dashboard.html', {
+        'orders': orders,
+        'favorites': _customer_favorites(request.user),
+    })
 
 
 def login_view(request):
@@ -225,8 +375,6 @@ def register_view(request):
             errors.append('Email is required.')
         elif not EMAIL_REGEX.match(email):
             errors.append('Enter a valid email address.')
-        elif User.objects.filter(email=email).exists():
-            errors.append('An account with this email already exists.')
 
         if not phone:
             errors.append('Phone number is required.')
@@ -259,32 +407,41 @@ def register_view(request):
         if not terms:
             errors.append('You must agree to the terms & conditions.')
 
-        if errors:
-            for e in errors:
-                messages.error(request, e)
-            context = {
-                'form_data': {
-                    'name': name,
-                    'email': email,
-                    'phone': phone,
-                    'address': address,
-                    'userType': user_type,
-                    'speciality': speciality,
-                }
+        if not errors:
+            location = geo.geocode(address)
+            try:
+                with transaction.atomic():
+                    User.objects.create_user(
+                        email=email,
+                        password=password1,
+                        first_name=name,
+                        phone=phone,
+                        address=address,
+                        user_type=user_type,
+                        speciality=speciality or '',
+                        latitude=location[0] if location else None,
+                        longitude=location[1] if location else None,
+                    )
+            except IntegrityError:
+                # email is unique in the database, so a taken address (even one registered a moment ago) ends up here
+                errors.append('An account with this email already exists.')
+            else:
+                messages.success(request, 'Account created successfully! Please log in with your email and password.')
+                return redirect('core:login')
+
+        for e in errors:
+            messages.error(request, e)
+        context = {
+            'form_data': {
+                'name': name,
+                'email': email,
+                'phone': phone,
+                'address': address,
+                'userType': user_type,
+                'speciality': speciality,
             }
-            return render(request, 'core/register.html', context)
-
-        User.objects.create_user(
-            email=email,
-            password=password1,
-            first_name=name,
-            phone=phone,
-            address=address,
-            user_type=user_type,
-            speciality=speciality or '',
-        )
-        messages.success(request, 'Account created successfully! Please log in with your email and password.')
-        return redirect('core:login')
+        }
+        return render(request, 'core/register.html', context)
     return render(request, 'core/register.html', {'form_data': {}})
 
 
@@ -297,22 +454,40 @@ def contact(request):
 
 def chef_profile(request):
     # Only show chefs who have at least one food item available for sell (servings_available > 0)
+    sort = ranking.resolve_sort(request.GET.get('sort'))
+    available = FoodItem.objects.filter(chef=OuterRef('pk'), servings_available__gt=0)
     chefs = (
         User.objects.filter(user_type='chef')
-        .filter(food_items__servings_available__gt=0)
-        .distinct()
+        .filter(Exists(available))
         .annotate(
-            food_count=Count('food_items', distinct=True, filter=Q(food_items__servings_available__gt=0)),
-            review_count=Count('food_items__reviews', distinct=True),
-            avg_rating=Avg('food_items__reviews__rating'),
+            food_count=Subquery(
+                available.order_by().values('chef').annotate(n=Count('id')).values('n'),
+                output_field=IntegerField(),
+            ),
         )
+        .order_by(*ranking.CHEF_SORT_ORDERINGS[sort])
     )
-    return render(request, 'core/chef_profile.html', {'chefs': chefs})
+    nearby_chef_ids = _nearby_chef_ids(request)
+    if nearby_chef_ids is not None:
+        chefs = chefs.filter(id__in=nearby_chef_ids)
+    return render(request, 'core/chef_profile.html', {
+        'chefs': chefs,
+        'sort': sort,
+        'near_me': nearby_chef_ids is not None,
+    })
+
+
+def chef_detail(request, chef_id):
+    chef = get_object_or_404(User, id=chef_id, user_type='chef')
+    return render(request, 'core/chef_detail.html', {
+        'chef': chef,
+        'page_body': chef_pages.body(chef),
+    })
 
 
 def food_details(request, item_id):
     food_item = get_object_or_404(FoodItem.objects.select_related('chef'), id=item_id)
-    reviews = food_item.reviews.select_related('customer').all()[:50]
+    reviews = food_item.reviews.prefetch_related('customer').all()[:50]
     from django.db.models import Avg
     avg_rating = food_item.reviews.aggregate(Avg('rating'))['rating__avg'] or 0
     review_count = food_item.reviews.count()
@@ -326,12 +501,14 @@ def food_details(request, item_id):
             try:
                 rating = int(rating)
                 if 1 <= rating <= 5 and text:
-                    Review.objects.get_or_create(
-                        food_item=food_item,
-                        customer=request.user,
-                        defaults={'rating': rating, 'text': text}
-                    )
-                    messages.success(request, 'Thank you! Your review has been added.')
+                    shard = sharding.shard_for(food_item.chef_id)
+                    try:
+                        with transaction.atomic(using=shard):
+                            Review.objects.using(shard).create(food_item=food_item, customer=request.user, rating=rating, text=text)
+                        messages.success(request, 'Thank you! Your review has been added.')
+                    except IntegrityError:
+                        # core_review_item_customer_uniq: one review per customer per dish
+                        messages.info(request, 'You have already reviewed this dish.')
                 else:
                     messages.error(request, 'Please select a rating (1-5) and write a review.')
             except (ValueError, TypeError):
@@ -383,9 +560,11 @@ def chef_dashboard(request):
                         is_vegetarian=is_veg,
                         is_spicy=is_spicy,
                     )
-                    if image_file:
-                        item.image = image_file
                     item.save()
+                    if image_file:
+                        # Stage on local disk; a background job moves it into media storage
+                        staged_name = tasks.upload_staging.save(f'{uuid.uuid4().hex}/{image_file.name}', image_file)
+                        jobs.enqueue('store_food_image', priority=5, food_item_id=item.id, staged_name=staged_name)
                     messages.success(request, 'Food item posted! It will appear on the home page.')
                 except Exception as e:
                     messages.error(request, f'Could not save: {e}')
@@ -394,32 +573,66 @@ def chef_dashboard(request):
             return redirect('core:chef_dashboard')
 
         if action == 'order_status':
-            order_id = request.POST.get('order_id')
+            order_id = request.POST.get('order_id', '')
             new_status = request.POST.get('status')
-            if order_id and new_status:
-                order_obj = Order.objects.filter(chef=chef, id=order_id).first()
-                if order_obj and new_status in dict(Order.STATUS_CHOICES):
-                    order_obj.status = new_status
-                    order_obj.save()
-                    # When marked delivered, reduce food item servings; remove from listings when 0
-                    if new_status == 'delivered' and order_obj.food_item_id:
-                        fi = order_obj.food_item
-                        fi.servings_available = max(0, (fi.servings_available or 0) - order_obj.quantity)
-                        fi.save()
+            if order_id.isdigit() and new_status in dict(Order.STATUS_CHOICES):
+                try:
+                    changed = transitions.change_status(chef, [int(order_id)], new_status)
+                except ValueError:
+                    changed = []
+                except transitions.OrdersChanged:
+                    messages.error(request, 'This order was just updated elsewhere. Please check its status and try again.')
+                    return redirect('core:chef_dashboard')
+                if changed:
                     messages.success(request, 'Order status updated.')
+                else:
+                    messages.error(request, 'That status change is not allowed for this order.')
             return redirect('core:chef_dashboard')
 
         if action == 'review_reply':
             review_id = request.POST.get('review_id')
             reply = request.POST.get('chef_reply', '').strip()
-            if review_id:
-                review_obj = Review.objects.filter(food_item__chef=chef, id=review_id).first()
-                if review_obj:
-                    review_obj.chef_reply = reply
-                    review_obj.save()
+            if review_id and review_id.isdigit():
+                # One UPDATE scoped to the chef's own dishes; it skips the Review signals, so refresh the page here
+                replied = (
+                    Review.objects.using(sharding.shard_for(chef.id))
+                    .filter(food_item__in=_chef_item_ids(chef), id=review_id).update(chef_reply=reply)
+                )
+                if replied:
+                    chef_pages.invalidate(chef.id)
                     messages.success(request, 'Reply saved.')
             return redirect('core:chef_dashboard')
 
+        if action == 'delivery_area':
+            try:
+                radius = float(request.POST.get('delivery_radius_km', chef.delivery_radius_km))
+            except (TypeError, ValueError):
+                radius = chef.delivery_radius_km
+            chef.delivery_radius_km = min(max(radius, 0.5), settings.MAX_DELIVERY_RADIUS_KM)
+            location = geo.geocode(chef.address)
+            if location:
+                chef.latitude, chef.longitude = location
+            chef.save(update_fields=['delivery_radius_km', 'latitude', 'longitude'])
+            if location:
+                messages.success(request, 'Delivery area updated.')
+            else:
+                messages.warning(request, 'Delivery radius saved, but we could not find your address area. Please include your locality (e.g. Baneshwor, Patan).')
+            return redirect('core:chef_dashboard')
+
+        if action == 'delivery_slots':
+            try:
+                from_hour = int(request.POST.get('from_hour', 11))
+                to_hour = int(request.POST.get('to_hour', 14))
+                capacity = int(request.POST.get('capacity', 5))
+            except (TypeError, ValueError):
+                from_hour = to_hour = capacity = 0
+            if 0 <= from_hour < to_hour <= 23 and 1 <= capacity <= 100:
+                count = slots.open_slots(chef, timezone.localdate(), SLOT_DAYS, from_hour, to_hour, capacity)
+                messages.success(request, f'{count} delivery slots open for the next {SLOT_DAYS} days.')
+            else:
+                messages.error(request, 'Choose a start hour before the end hour and a capacity from 1 to 100.')
+            return redirect('core:chef_dashboard')
+
         if action == 'delete_food':
             food_item_id = request.POST.get('food_item_id')
             if food_item_id:
@@ -432,26 +645,28 @@ def chef_dashboard(request):
                     messages.error(request, 'Food item not found or you cannot delete it.')
             return redirect('core:chef_dashboard')
 
-    # GET: dashboard data — only this chef's posted food items and related orders/reviews
-    orders = Order.objects.filter(chef=chef).select_related('customer', 'food_item').order_by('-created_at')[:50]
-    delivered_orders = Order.objects.filter(chef=chef, status='delivered').select_related('food_item').order_by('-created_at')[:30]
-    reviews = Review.objects.filter(food_item__chef=chef).select_related('customer', 'food_item').order_by('-created_at')[:50]
+    # GET: dashboard data — only this chef's posted food items and related orders/reviews (on the chef's shard)
+    chef_orders = Order.objects.using(sharding.shard_for(chef.id)).filter(chef=chef)
+    chef_reviews = Review.objects.using(sharding.shard_for(chef.id)).filter(food_item__in=_chef_item_ids(chef))
+    orders = chef_orders.prefetch_related('customer', 'food_item').order_by('-created_at')[:50]
+    delivered_orders = chef_orders.filter(status='delivered').prefetch_related('food_item').order_by('-created_at')[:30]
+    reviews = chef_reviews.prefetch_related('customer', 'food_item').order_by('-created_at')[:50]
     food_items = FoodItem.objects.filter(chef=chef, servings_available__gt=0)
     chef_food_items = FoodItem.objects.filter(chef=chef).order_by('-created_at')
 
     # Earnings: sum of total for delivered (or all non-cancelled) orders
     from django.db.models.functions import Coalesce
-    delivered = Order.objects.filter(chef=chef, status='delivered')
+    delivered = chef_orders.filter(status='delivered')
     earnings_total = 0
     for o in delivered:
-        earnings_total += _parse_total(o.total)
+        earnings_total += analytics.parse_total(o.total)
     this_month = delivered.filter(created_at__month=timezone.now().month, created_at__year=timezone.now().year)
-    earnings_month = sum(_parse_total(o.total) for o in this_month)
+    earnings_month = sum(analytics.parse_total(o.total) for o in this_month)
 
-    pending_count = Order.objects.filter(chef=chef).filter(status='pending').count()
-    completed_count = Order.objects.filter(chef=chef).filter(status='delivered').count()
+    pending_count = chef_orders.filter(status='pending').count()
+    completed_count = chef_orders.filter(status='delivered').count()
     from django.db.models import Avg
-    avg_rating = Review.objects.filter(food_item__chef=chef).aggregate(Avg('rating'))['rating__avg'] or 0
+    avg_rating = chef_reviews.aggregate(Avg('rating'))['rating__avg'] or 0
 
     return render(request, 'core/chef_dashboard.html', {
         'orders': orders,
@@ -464,9 +679,71 @@ def chef_dashboard(request):
         'earnings_total': int(earnings_total),
         'earnings_month': int(earnings_month),
         'avg_rating': round(float(avg_rating), 1),
+        'max_delivery_radius_km': settings.MAX_DELIVERY_RADIUS_KM,
+        'delivery_slots': slots.bookable(chef),
+        'slot_hours': range(6, 24),
     })
 
 
+@login_required(login_url='core:login')
+@require_POST
+def chef_order_status(request):
+    """Bulk status change: POST order_ids=<id>&order_ids=<id>...&status=<status>. Returns the orders now in that status."""
+    if _user_role(request.user) != 'chef':
+        return JsonResponse({'error': 'Only chefs can update orders.'}, status=403)
+    new_status = request.POST.get('status', '')
+    order_ids = [int(i) for i in request.POST.getlist('order_ids') if i.isdigit()]
+    if new_status not in dict(Order.STATUS_CHOICES) or not order_ids:
+        return JsonResponse({'error': 'Choose a status and at least one order.'}, status=400)
+    try:
+        changed = transitions.change_status(request.user, order_ids, new_status)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except transitions.OrdersChanged:
+        return JsonResponse({'error': 'Some of these orders were just updated elsewhere. Reload the page and try again.'}, status=409)
+    return JsonResponse({
+        'status': new_status,
+        'changed': [
+            {
+                'id': order.id,
+                'status': order.status,
+                'status_display': order.get_status_display(),
+                'next_statuses': order.next_status_choices(),
+            }
+            for order in changed
+        ],
+        'unchanged': sorted(set(order_ids) - {order.id for order in changed}),
+    })
+
+
+ANALYTICS_DEFAULT_RANGE = {'hour': timedelta(days=2), 'day': timedelta(days=30)}
+
+
+def _parse_day(value):
+    """A ?start=/?end= date (YYYY-MM-DD) as the aware local midnight, or None."""
+    try:
+        day = parse_date(value or '')
+    except ValueError:
+        return None
+    return timezone.make_aware(datetime.combine(day, time.min)) if day else None
+
+
+@login_required(login_url='core:login')
+def chef_analytics(request):
+    """JSON series for the chef's sales charts: ?grain=hour|day&start=&end=&item=."""
+    if _user_role(request.user) != 'chef':
+        return JsonResponse({'error': 'Only chefs can view analytics.'}, status=403)
+    grain = request.GET.get('grain', 'day')
+    if grain not in analytics.GRAINS:
+        return JsonResponse({'error': 'grain must be "hour" or "day".'}, status=400)
+    end = _parse_day(request.GET.get('end'))
+    end = end + timedelta(days=1) if end else timezone.now() + analytics.GRAINS[grain]
+    start = _parse_day(request.GET.get('start')) or end - ANALYTICS_DEFAULT_RANGE[grain]
+    item_id = request.GET.get('item', '')
+    data = analytics.series(request.user, grain, start, end, food_item_id=int(item_id) if item_id.isdigit() else None)
+    return JsonResponse(data)
+
+
 def logout_view(request):
     auth_logout(request)
     messages.success(request, 'You have been logged out.')